@@ -0,0 +1 @@
+"""Benchmarks of the datasets and the visualiser, see :mod:`benchmarks.run`."""
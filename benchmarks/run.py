@@ -0,0 +1,267 @@
+"""Throughput benchmarks of the datasets and the visualiser, on synthetic data.
+
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Measures, for every dataset,
+
+- ``import.<dataset>.seconds`` and ``.modules``: importing the dataset class in a fresh
+  process and the number of modules that pulls in, which catches a dataset paying for the
+  dependencies of the others (``import.package`` is a bare ``import datasets``),
+- ``construct.<dataset>.<mode>.seconds``, ``.peak_rss_mb`` and ``.rss_growth_mb``: building
+  the dataset in a fresh process, parsing the annotations (``parse``) or from a warm
+  annotation cache (``cached``); the growth excludes the memory of the imports,
+- ``load.<dataset>.workers=<n>.samples_per_sec``: a full ``DataLoader`` pass decoding
+  every image, with ``n`` workers,
+- ``render.<dataset>.ms`` and ``.payload_kb``: building the figure of a page in the
+  visualiser and its serialized size.
+
+With ``--baseline`` every metric is compared to a stored run, and the command exits with
+status 1 if any metric is worse than the baseline by more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from torch.utils.data import DataLoader
+
+from . import synthetic
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(REPO, "src", "app")
+
+
+def _acid(root: str, cache: bool):
+    from datasets import ACID
+    return ACID(root, eager=True, cache=cache)
+
+
+def _luo2020(root: str, cache: bool):
+    from datasets import Luo2020
+    return Luo2020(root, cache=cache)
+
+
+def _bang2020(root: str, cache: bool):
+    from datasets import Bang2020
+    return Bang2020(root, cache=cache)
+
+
+def _mocs(root: str, cache: bool):
+    from datasets import MOCS
+    return MOCS(root, "train", cache=cache)
+
+
+DATASETS: Dict[str, Callable] = {"ACID": _acid, "luo2020": _luo2020, "bang2020": _bang2020, "MOCS": _mocs}
+CLASS_NAMES = {"ACID": "ACID", "luo2020": "Luo2020", "bang2020": "Bang2020", "MOCS": "MOCS"}
+
+
+# run with ``python -c``, as this module imports torch itself
+IMPORT_SCRIPT = """
+import json, sys, time
+before = len(sys.modules)
+tic = time.perf_counter()
+import datasets
+if sys.argv[1]:
+    getattr(datasets, sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - tic, "modules": len(sys.modules) - before}))
+"""
+
+
+def benchmark_import(names: List[str], runs: int = 3) -> Dict[str, float]:
+    results = {}
+    for name in ["package"] + names:
+        command = [sys.executable, "-c", IMPORT_SCRIPT, CLASS_NAMES.get(name, "")]
+        children = [
+            json.loads(subprocess.run(command, cwd=REPO, check=True, capture_output=True, text=True).stdout)
+            for _ in range(runs)
+        ]
+        # the fastest run is the least disturbed by the rest of the machine
+        results[f"import.{name}.seconds"] = min(child["seconds"] for child in children)
+        results[f"import.{name}.modules"] = children[0]["modules"]
+    return results
+
+
+def benchmark_construct(root: str, names: List[str]) -> Dict[str, float]:
+    results = {}
+    for name in names:
+        # the first cached run writes the cache, the second one is measured
+        for mode, runs in (("parse", 1), ("cached", 2)):
+            for _ in range(runs):
+                child = _run_child(name, mode, root)
+            results[f"construct.{name}.{mode}.seconds"] = child["seconds"]
+            if child["peak_rss_mb"] is not None:
+                results[f"construct.{name}.{mode}.peak_rss_mb"] = child["peak_rss_mb"]
+                results[f"construct.{name}.{mode}.rss_growth_mb"] = child["rss_growth_mb"]
+    return results
+
+
+def _construct_child(name: str, mode: str, root: str) -> None:
+    # the import time is not part of the construction
+    import datasets
+    getattr(datasets, CLASS_NAMES[name])
+
+    before = _peak_rss_mb()
+    tic = time.perf_counter()
+    DATASETS[name](root, cache=mode == "cached")
+    seconds = time.perf_counter() - tic
+    after = _peak_rss_mb()
+    growth = None if after is None else after - before
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": after, "rss_growth_mb": growth}))
+
+
+def _run_child(name: str, mode: str, root: str) -> dict:
+    """Run ``--child`` in a fresh process and return the json it prints last."""
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--child", name, mode, "--root", root],
+        cwd=REPO,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark_load(root: str, names: List[str], workers: List[int], batch_size: int = 16) -> Dict[str, float]:
+    results = {}
+    for name in names:
+        dataset = DATASETS[name](root, cache=True)
+        for num_workers in workers:
+            loader = DataLoader(dataset, batch_size=batch_size, num_workers=num_workers, collate_fn=_collate)
+            tic = time.perf_counter()
+            samples = sum(len(batch) for batch in loader)
+            results[f"load.{name}.workers={num_workers}.samples_per_sec"] = samples / (time.perf_counter() - tic)
+    return results
+
+
+def _collate(batch):
+    return batch
+
+
+def benchmark_render(root: str, names: List[str], pages: int = 20) -> Dict[str, float]:
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    import plotly.io as pio
+    from renderers import default_renderers
+    from thumbnails import Thumbnailer
+
+    thumbnails = Thumbnailer()
+    results = {}
+    for renderer in default_renderers():
+        if renderer.name not in names:
+            continue
+        dataset = renderer.create_dataset(root)
+        count = min(pages, len(dataset))
+        seconds, payload = 0.0, 0
+        for i in range(count):
+            tic = time.perf_counter()
+            fig = renderer.render(dataset, i, thumbnails)
+            payload += len(pio.to_json(fig))
+            seconds += time.perf_counter() - tic
+        results[f"render.{renderer.name}.ms"] = seconds / count * 1000
+        results[f"render.{renderer.name}.payload_kb"] = payload / count / 1024
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Print every metric next to its baseline and return the names of the regressed metrics."""
+    regressions = []
+    print(f"{'metric':<56} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, value in sorted(results.items()):
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name:<56} {'-':>12} {value:>12.3f}")
+            continue
+        change = (value - old) / old if old else 0.0
+        worse = -change if _higher_is_better(name) else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<56} {old:>12.3f} {value:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _higher_is_better(name: str) -> bool:
+    return name.endswith("per_sec")
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def run(args) -> Dict[str, float]:
+    names = args.datasets or list(DATASETS)
+    results = {}
+    if "import" in args.benchmarks:
+        results.update(benchmark_import(names))
+    if "construct" in args.benchmarks:
+        results.update(benchmark_construct(args.root, names))
+    if "load" in args.benchmarks:
+        results.update(benchmark_load(args.root, names, args.workers))
+    if "render" in args.benchmarks:
+        results.update(benchmark_render(args.root, names))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the datasets and the visualiser")
+    parser.add_argument("--root", help="synthetic data directory, generated in a temporary directory if not given")
+    parser.add_argument("--images", type=int, default=200, help="number of images per generated dataset")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), help="datasets to benchmark")
+    parser.add_argument("--benchmarks", nargs="+", default=["import", "construct", "load", "render"],
+                        choices=["import", "construct", "load", "render"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4], help="DataLoader worker counts")
+    parser.add_argument("--output", help="write the results to this json file")
+    parser.add_argument("--save-baseline", help="write the results as baseline to this json file")
+    parser.add_argument("--baseline", help="compare the results to this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative change reported as regression")
+    parser.add_argument("--child", nargs=2, metavar=("DATASET", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        _construct_child(args.child[0], args.child[1], args.root)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.root is None:
+            args.root = tmp
+            print(f"Generating {args.images} synthetic images per dataset")
+            synthetic.generate(args.root, args.images)
+        results = run(args)
+
+    report = {
+        "meta": {"images": args.images, "python": platform.python_version(), "machine": platform.machine()},
+        "results": results,
+    }
+    for file in (args.output, args.save_baseline):
+        if file is not None:
+            with open(file, "w") as fp:
+                json.dump(report, fp, indent=2)
+
+    baseline = {}
+    if args.baseline is not None:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Synthetic datasets in the on-disk layout of every supported dataset.
+
+    python -m benchmarks.synthetic <root> [--images N]
+
+The annotations are random but well-formed, and the images are smooth random JPEGs, so
+parsing, decoding and rendering cost about as much as on the real datasets.
+"""
+import argparse
+import json
+import os
+import random
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+ACID_CLASSES = ["excavator", "dump_truck", "mixer", "mobile_crane", "wheel_loader", "backhoe_loader"]
+MOCS_CLASSES = ["worker", "static_crane", "hanging_head", "crane", "roller", "bulldozer", "excavator", "truck"]
+LUO_KEYPOINTS = ["body_end", "cab_boom", "boom_arm", "arm_bucket", "bucket_end_left", "bucket_end_right"]
+BANG_PHRASES = ["a truck on the road", "an excavator digging", "workers near the crane", "a pile of materials"]
+
+
+def generate(
+        root: str,
+        num_images: int = 200,
+        image_size: Tuple[int, int] = (640, 480),
+        max_objects: int = 8,
+        seed: int = 0
+) -> None:
+    """Write all four synthetic datasets to ``root``, ``num_images`` images per dataset (and per MOCS split)."""
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    make_acid(root, num_images, image_size, max_objects, rng, np_rng)
+    make_luo2020(root, num_images, image_size, rng, np_rng)
+    make_bang2020(root, num_images, image_size, max_objects, rng, np_rng)
+    make_mocs(root, num_images, image_size, max_objects, rng, np_rng)
+
+
+def make_acid(root, num_images, image_size, max_objects, rng, np_rng) -> None:
+    images_dir = os.path.join(root, "ACID", "ACID_Images")
+    labels_dir = os.path.join(root, "ACID", "ACID_Annotations")
+    os.makedirs(images_dir, exist_ok=True)
+    os.makedirs(labels_dir, exist_ok=True)
+
+    width, height = image_size
+    for i in range(num_images):
+        name = f"{i:06d}"
+        _write_image(os.path.join(images_dir, f"{name}.jpg"), image_size, np_rng)
+        objects = []
+        for _ in range(rng.randint(1, max_objects)):
+            xmin, ymin, xmax, ymax = _box(width, height, rng)
+            objects.append(
+                f"<object><name>{rng.choice(ACID_CLASSES)}</name><pose>Unspecified</pose>"
+                f"<truncated>{rng.randint(0, 1)}</truncated><difficult>{rng.randint(0, 1)}</difficult>"
+                f"<bndbox><xmin>{xmin}</xmin><ymin>{ymin}</ymin><xmax>{xmax}</xmax><ymax>{ymax}</ymax></bndbox>"
+                f"</object>"
+            )
+        with open(os.path.join(labels_dir, f"{name}.xml"), "w") as fp:
+            fp.write(
+                f"<annotation><filename>{name}.jpg</filename>"
+                f"<size><width>{width}</width><height>{height}</height><depth>3</depth></size>"
+                f"{''.join(objects)}</annotation>"
+            )
+
+
+def make_luo2020(root, num_images, image_size, rng, np_rng) -> None:
+    base = os.path.join(root, "luo2020", "equipment_pose_dataset")
+    os.makedirs(os.path.join(base, "images"), exist_ok=True)
+    os.makedirs(os.path.join(base, "labels"), exist_ok=True)
+
+    width, height = image_size
+    rows = ["image," + ",".join(f"{name}_{axis}" for name in LUO_KEYPOINTS for axis in "xy")]
+    for i in range(num_images):
+        _write_image(os.path.join(base, "images", f"{i:06d}.jpg"), image_size, np_rng)
+        values = [f"{rng.uniform(0, width):.1f},{rng.uniform(0, height):.1f}" for _ in LUO_KEYPOINTS]
+        rows.append(f"{i:06d}.jpg," + ",".join(values))
+    with open(os.path.join(base, "labels", "labels.csv"), "w") as fp:
+        fp.write("\n".join(rows) + "\n")
+
+
+def make_bang2020(root, num_images, image_size, max_objects, rng, np_rng) -> None:
+    base = os.path.join(root, "bang2020")
+    os.makedirs(os.path.join(base, "UAVData"), exist_ok=True)
+
+    width, height = image_size
+    regions_data = {}
+    for i in range(num_images):
+        file_name = f"{i:06d}.jpg"
+        _write_image(os.path.join(base, "UAVData", file_name), image_size, np_rng)
+        regions = {}
+        for k in range(rng.randint(1, max_objects)):
+            xmin, ymin, xmax, ymax = _box(width, height, rng)
+            regions[str(k)] = {
+                "shape_attributes": {"name": "rect", "x": xmin, "y": ymin, "width": xmax - xmin, "height": ymax - ymin},
+                "region_attributes": {"phrase": rng.choice(BANG_PHRASES)},
+            }
+        size = os.path.getsize(os.path.join(base, "UAVData", file_name))
+        regions_data[f"{file_name}{size}"] = {
+            "filename": file_name, "size": size, "regions": regions, "file_attributes": {}
+        }
+    with open(os.path.join(base, "via_region_data_final.json"), "w") as fp:
+        json.dump(regions_data, fp)
+
+
+def make_mocs(root, num_images, image_size, max_objects, rng, np_rng) -> None:
+    base = os.path.join(root, "MOCS")
+    categories = [{"id": i + 1, "name": name} for i, name in enumerate(MOCS_CLASSES)]
+
+    width, height = image_size
+    for split in ("train", "val"):
+        images_dir = os.path.join(base, f"instances_{split}")
+        os.makedirs(images_dir, exist_ok=True)
+        images, annotations = [], []
+        for i in range(num_images):
+            file_name = f"{split}_{i:06d}.jpg"
+            _write_image(os.path.join(images_dir, file_name), image_size, np_rng)
+            images.append({"id": i + 1, "file_name": file_name, "width": width, "height": height})
+            for _ in range(rng.randint(0, max_objects)):
+                xmin, ymin, xmax, ymax = _box(width, height, rng)
+                parts = [_polygon(xmin, ymin, xmax, ymax, rng) for _ in range(rng.randint(1, 2))]
+                annotations.append({
+                    "id": len(annotations) + 1,
+                    "image_id": i + 1,
+                    "category_id": rng.choice(categories)["id"],
+                    "bbox": [xmin, ymin, xmax - xmin, ymax - ymin],
+                    "area": (xmax - xmin) * (ymax - ymin),
+                    "iscrowd": 0,
+                    "segmentation": parts,
+                })
+        rng.shuffle(annotations)
+        with open(os.path.join(base, f"instances_{split}.json"), "w") as fp:
+            json.dump({"images": images, "categories": categories, "annotations": annotations}, fp)
+
+
+def _write_image(file: str, size: Tuple[int, int], np_rng) -> None:
+    # upscaled noise is smooth like a photo, so it encodes and decodes at realistic speed
+    width, height = size
+    small = np_rng.integers(0, 256, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    Image.fromarray(small).resize(size, Image.BILINEAR).save(file, quality=90)
+
+
+def _box(width: int, height: int, rng) -> Tuple[int, int, int, int]:
+    w, h = rng.randint(8, max(8, width // 3)), rng.randint(8, max(8, height // 3))
+    x, y = rng.randint(0, width - w), rng.randint(0, height - h)
+    return x, y, x + w, y + h
+
+
+def _polygon(xmin: int, ymin: int, xmax: int, ymax: int, rng) -> list:
+    return [round(rng.uniform(lo, hi), 2) for _ in range(rng.randint(3, 12)) for lo, hi in ((xmin, xmax), (ymin, ymax))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic construction datasets")
+    parser.add_argument("root", help="output directory")
+    parser.add_argument("--images", type=int, default=200, help="number of images per dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.root, args.images, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,49 @@
-from .acid import ACID
-from .bang2020 import Bang2020
-from .luo2020 import Luo2020
-from .mocs import MOCS
+import importlib
+from typing import TYPE_CHECKING
+
+# the public names are imported from their module on first access (PEP 562), so that e.g.
+# ``from datasets import ACID`` imports neither the other datasets nor their dependencies
+_EXPORTS = {
+    "ACID": "acid",
+    "Bang2020": "bang2020",
+    "Luo2020": "luo2020",
+    "MOCS": "mocs",
+    "Prefetcher": "prefetch",
+    "PrefetchStats": "prefetch",
+    "StageProfiler": "profiling",
+    "FileManifest": "manifest",
+    "QueryIndex": "query",
+    "ShardedDataset": "shards",
+    "export_shards": "shards",
+    "DatasetStatistics": "stats",
+    "UnifiedDataset": "unified",
+    "WeightedInterleavedSampler": "unified",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .acid import ACID
+    from .bang2020 import Bang2020
+    from .luo2020 import Luo2020
+    from .mocs import MOCS
+    from .prefetch import Prefetcher, PrefetchStats
+    from .profiling import StageProfiler
+    from .manifest import FileManifest
+    from .query import QueryIndex
+    from .shards import ShardedDataset, export_shards
+    from .stats import DatasetStatistics
+    from .unified import UnifiedDataset, WeightedInterleavedSampler
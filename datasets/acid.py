@@ -1,11 +1,21 @@
 import os.path
-from typing import Optional, Callable, Tuple, Any
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Callable, Tuple, Any, Dict, List
 
-from PIL import Image
-from torchvision.datasets import VisionDataset
+import numpy as np
+from .base import ConstructionDataset
+from .bundle import Bundle
+from . import transforms as T
+from .compact import ObjectTable, StringTable, split
+from .manifest import FileManifest
 
+# serializes building the arrays of lazy datasets, e.g. for queries from several threads
+_LOAD_LOCK = threading.Lock()
 
-class ACID(VisionDataset):
+
+class ACID(ConstructionDataset):
     """`ACID
     <https://doi.org/10.1061/(asce)cp.1943-5487.0000945>`_ Dataset.
 
@@ -18,6 +28,26 @@ class ACID(VisionDataset):
             and returns a transformed version. E.g, ``transforms.RandomCrop``
         target_transform (callable, optional): A function/transform that takes in the
             target and transforms it.
+        eager (bool, optional): If True, all xml annotations are parsed at construction time into
+            arrays of boxes, class ids and flags. Otherwise the xml file of an image is parsed every
+            time the image is requested.
+        cache (bool, optional): If True, the annotations are parsed eagerly and cached as
+            memory-mapped arrays (see :class:`~datasets.cache.AnnotationCache`), and the listing
+            of the image directory is cached as well (see :class:`~datasets.manifest.FileManifest`).
+        cache_dir (string, optional): Directory of the caches, defaults to ``ACID/ACID_Annotations/``.
+        num_workers (int, optional): Number of processes parsing the xml files, defaults to the
+            number of CPUs. ``0`` parses them in the current process.
+        return_arrays (bool, optional): If True, the target is ``{"boxes": array, "names": list,
+            "poses": list, "truncated": array, "difficult": array}`` with a ``(N, 4)`` float32 array of ``xyxy`` boxes
+            instead of a list of dicts. :mod:`datasets.transforms` works on these arrays.
+        max_side (int, optional): If set, images are scaled down so that their longer side is at
+            most ``max_side`` and the target is scaled to match. JPEG images are decoded at a
+            reduced scale directly.
+        resize_cache_dir (string, optional): If set together with ``max_side``, resized images are
+            stored in and reused from this directory.
+        bundle (string, optional): Directory of a bundle compiled by :mod:`datasets.compile`. The
+            annotations are memory-mapped from it instead of being parsed or cached, and the images
+            are still read from ``root``.
     """
 
     def __init__(
@@ -25,13 +55,25 @@ class ACID(VisionDataset):
             root: str,
             transforms: Optional[Callable] = None,
             transform: Optional[Callable] = None,
-            target_transform: Optional[Callable] = None
+            target_transform: Optional[Callable] = None,
+            eager: bool = False,
+            cache: bool = False,
+            cache_dir: Optional[str] = None,
+            num_workers: Optional[int] = None,
+            return_arrays: bool = False,
+            max_side: Optional[int] = None,
+            resize_cache_dir: Optional[str] = None,
+            bundle: Optional[str] = None
     ) -> None:
         super(ACID, self).__init__(root, transforms=transforms, transform=transform,
                                    target_transform=target_transform)
+        self.max_side = max_side
+        self.resize_cache_dir = resize_cache_dir
+        self.bundle = Bundle.for_dataset(bundle, self) if bundle is not None else None
 
-        self.images = []
-        self.targets = []
+        self.objects = None
+        self.num_workers = num_workers
+        self.return_arrays = return_arrays
 
         if not self._check_exists():
             raise RuntimeError(
@@ -40,39 +82,139 @@ class ACID(VisionDataset):
                 f"https://www.acidb.ca/"
             )
 
-        for img_file in os.listdir(self.images_dir):
-            self.images.append(os.path.join(self.images_dir, img_file))
-            self.targets.append(os.path.join(self.labels_dir, f"{img_file.split('.')[0]}.xml"))
+        if self.bundle is not None:
+            self.images = self.bundle.manifest(self.images_dir)
+        else:
+            manifest_file = os.path.join(cache_dir or self.labels_dir, "ACID_Images.manifest") if cache else None
+            self.images = FileManifest.load(self.images_dir, manifest_file)
+
+        if eager or cache or self.bundle is not None:
+            self._load_from_arrays(self._load_annotations(self.__class__.__name__, cache, cache_dir))
+
+    def _annotation_sources(self) -> List[str]:
+        return [self._target_file(index) for index in range(len(self))]
+
+    def _target_file(self, index: int) -> str:
+        return os.path.join(self.labels_dir, f"{self.images[index].split('.')[0]}.xml")
+
+    def _parse_annotations(self) -> Dict[str, np.ndarray]:
+        names, poses = {}, {}
+        lengths = []
+        columns = {"name": [], "pose": [], "truncated": [], "difficult": [], "bbox": []}
+        for objects in self._parse_all():
+            lengths.append(len(objects))
+            for name, pose, truncated, difficult, bbox in objects:
+                columns["name"].append(names.setdefault(name, len(names)))
+                columns["pose"].append(poses.setdefault(pose, len(poses)))
+                columns["truncated"].append(truncated)
+                columns["difficult"].append(difficult)
+                columns["bbox"].append(bbox)
+
+        objects = ObjectTable.from_lengths(lengths, {
+            "name": np.array(columns["name"], dtype=np.int32),
+            "pose": np.array(columns["pose"], dtype=np.int32),
+            "truncated": np.array(columns["truncated"], dtype=bool),
+            "difficult": np.array(columns["difficult"], dtype=bool),
+            "bbox": np.array(columns["bbox"], dtype=np.int32).reshape(-1, 4),
+        })
+        return {
+            **objects.to_arrays("objects"),
+            **StringTable.from_strings(names).to_arrays("names"),
+            **StringTable.from_strings(poses).to_arrays("poses"),
+        }
+
+    def _parse_all(self):
+        """Parse all xml files, spread over a process pool unless ``num_workers`` is ``0``."""
+        num_workers = self.num_workers if self.num_workers is not None else os.cpu_count() or 1
+        targets = self._annotation_sources()
+        if num_workers == 0:
+            return map(_parse_objects, targets)
+
+        chunksize = max(1, min(256, len(targets) // (num_workers * 4)))
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            return list(executor.map(_parse_objects, targets, chunksize=chunksize))
+
+    def _load_from_arrays(self, arrays: Dict[str, np.ndarray]):
+        objects = ObjectTable.from_arrays(arrays, "objects")
+        self.names = list(StringTable.from_arrays(arrays, "names"))
+        self.poses = list(StringTable.from_arrays(arrays, "poses"))
+        # assigned last, _load_targets reads the names and poses once it sees the objects
+        self.objects = objects
 
     def __len__(self):
         return len(self.images)
 
-    def __getitem__(self, index: int) -> Tuple[Any, Any]:
-        image = Image.open(self.images[index])
-        target = []
-        import xml.etree.ElementTree as ET
-        tree = ET.parse(self.targets[index])
-        root = tree.getroot()
-        for obj in root.findall('object'):
-            # noinspection PyTypeChecker
-            target.append(
+    def _image_file(self, index: int) -> str:
+        return self.images.path(index)
+
+    def _load_target(self, index: int) -> Any:
+        return self._load_targets([index])[0]
+
+    def _load_targets(self, indices: List[int]) -> List[Any]:
+        table = self.objects
+        if table is None:
+            parsed = [_parse_objects(self._target_file(index)) for index in indices]
+            lengths = [len(objects) for objects in parsed]
+            rows = [obj for objects in parsed for obj in objects]
+            names, poses, truncated, difficult, bbox = ([row[i] for row in rows] for i in range(5))
+        else:
+            lengths, objects = table.gather(indices)
+            lengths = lengths.tolist()
+            names = [self.names[name] for name in objects["name"].tolist()]
+            poses = [self.poses[pose] for pose in objects["pose"].tolist()]
+            truncated = objects["truncated"].tolist()
+            difficult = objects["difficult"].tolist()
+            bbox = objects["bbox"].tolist()
+
+        if self.return_arrays:
+            ends = np.cumsum(lengths)[:-1]
+            return [
                 {
-                    "name": str(obj.findtext("name", default="N/A")),
-                    "pose": str(obj.findtext("pose", default="N/A")),
-                    "truncated": bool(int(obj.findtext("truncated", default="0"))),
-                    "difficult": bool(int(obj.findtext("difficult", default="0"))),
-                    "bbox": [int(x.text) for x in obj.find("bndbox")],
+                    "boxes": boxes,
+                    "names": image_names,
+                    "poses": image_poses,
+                    "truncated": image_truncated,
+                    "difficult": image_difficult,
                 }
-            )
+                for boxes, image_names, image_poses, image_truncated, image_difficult in zip(
+                    np.split(np.array(bbox, dtype=np.float32).reshape(-1, 4), ends),
+                    split(names, lengths),
+                    split(poses, lengths),
+                    np.split(np.array(truncated, dtype=bool), ends),
+                    np.split(np.array(difficult, dtype=bool), ends),
+                )
+            ]
+
+        target = [
+            {
+                "name": name,
+                "pose": pose,
+                "truncated": obj_truncated,
+                "difficult": obj_difficult,
+                "bbox": obj_bbox,
+            }
+            for name, pose, obj_truncated, obj_difficult, obj_bbox in zip(names, poses, truncated, difficult, bbox)
+        ]
+        return split(target, lengths)
 
-        if self.transform:
-            image, target = self.transform(image, target)
+    def _query_arrays(self):
+        with _LOAD_LOCK:
+            if self.objects is None:
+                # the index needs every annotation, so the lazy dataset becomes eager
+                self._load_from_arrays(self._parse_annotations())
+        return self.objects.offsets, self.objects.columns["name"], self.names, self.objects.columns["bbox"]
 
-        return image, target
+    def _scale_target(self, target: Any, sx: float, sy: float) -> Any:
+        if self.return_arrays:
+            return T.scale(target, sx, sy)
+        for obj in target:
+            xmin, ymin, xmax, ymax = obj["bbox"]
+            obj["bbox"] = [xmin * sx, ymin * sy, xmax * sx, ymax * sy]
+        return target
 
     def _check_exists(self) -> bool:
         """Check if the data directory exists."""
-        folders = [self.images_dir, self.labels_dir]
+        folders = [self.images_dir] if self.bundle is not None else [self.images_dir, self.labels_dir]
         return all(os.path.isdir(folder) for folder in folders)
 
     @property
@@ -82,3 +224,19 @@ class ACID(VisionDataset):
     @property
     def labels_dir(self):
         return os.path.join(self.root, self.__class__.__name__, "ACID_Annotations")
+
+
+def _parse_objects(xml_file: str) -> List[Tuple[str, str, bool, bool, List[int]]]:
+    """Parse the ``(name, pose, truncated, difficult, bbox)`` of every object in a VOC xml file."""
+    root = ET.parse(xml_file).getroot()
+    objects = []
+    for obj in root.findall('object'):
+        # noinspection PyTypeChecker
+        objects.append((
+            str(obj.findtext("name", default="N/A")),
+            str(obj.findtext("pose", default="N/A")),
+            bool(int(obj.findtext("truncated", default="0"))),
+            bool(int(obj.findtext("difficult", default="0"))),
+            [int(x.text) for x in obj.find("bndbox")],
+        ))
+    return objects
@@ -1,12 +1,17 @@
+import json
 import os.path
-from typing import Optional, Callable, Any, Tuple
+from typing import Optional, Callable, Any, Dict, List
 
-import pandas as pd
-from PIL import Image
-from torchvision.datasets import VisionDataset
+import numpy as np
 
+from .base import ConstructionDataset
+from .bundle import Bundle
+from . import transforms as T
+from .compact import ObjectTable, StringTable, split
+from .manifest import FileManifest
 
-class Bang2020(VisionDataset):
+
+class Bang2020(ConstructionDataset):
     """`Bang2020
     <https://doi.org/10.1016/j.autcon.2020.103116>`_ Dataset.
 
@@ -19,6 +24,19 @@ class Bang2020(VisionDataset):
                 and returns a transformed version. E.g, ``transforms.RandomCrop``
         target_transform (callable, optional): A function/transform that takes in the
             target and transforms it.
+        cache (bool, optional): If True, ``via_region_data_final.json`` is parsed once and cached as
+            memory-mapped arrays (see :class:`~datasets.cache.AnnotationCache`).
+        cache_dir (string, optional): Directory of the cache, defaults to ``bang2020/``.
+        return_arrays (bool, optional): If True, the target is ``{"boxes": array, "phrases": list}``
+            with a ``(N, 4)`` float32 array of ``xyxy`` boxes instead of a list of dicts.
+        max_side (int, optional): If set, images are scaled down so that their longer side is at
+            most ``max_side`` and the target is scaled to match. JPEG images are decoded at a
+            reduced scale directly.
+        resize_cache_dir (string, optional): If set together with ``max_side``, resized images are
+            stored in and reused from this directory.
+        bundle (string, optional): Directory of a bundle compiled by :mod:`datasets.compile`. The
+            annotations are memory-mapped from it instead of being parsed or cached, and the images
+            are still read from ``root``.
     """
 
     def __init__(
@@ -26,10 +44,19 @@ class Bang2020(VisionDataset):
             root: str,
             transforms: Optional[Callable] = None,
             transform: Optional[Callable] = None,
-            target_transform: Optional[Callable] = None
+            target_transform: Optional[Callable] = None,
+            cache: bool = False,
+            cache_dir: Optional[str] = None,
+            return_arrays: bool = False,
+            max_side: Optional[int] = None,
+            resize_cache_dir: Optional[str] = None,
+            bundle: Optional[str] = None
     ) -> None:
         super(Bang2020, self).__init__(root, transforms=transforms, transform=transform,
                                        target_transform=target_transform)
+        self.max_side = max_side
+        self.resize_cache_dir = resize_cache_dir
+        self.bundle = Bundle.for_dataset(bundle, self) if bundle is not None else None
 
         if not self._check_exists():
             raise RuntimeError(
@@ -38,44 +65,103 @@ class Bang2020(VisionDataset):
                 f"https://data.mendeley.com/datasets/4h68fmktwh/1"
             )
 
-        self.region_data = pd.read_json(os.path.join(self.labels_dir, "via_region_data_final.json"), orient='index')
+        arrays = self._load_annotations(self.__class__.__name__.lower(), cache, cache_dir)
+        self.image_files = FileManifest(self.images_dir, StringTable.from_arrays(arrays, "images.file_names"))
+        self.regions = ObjectTable.from_arrays(arrays, "regions")
+        self.phrases = list(StringTable.from_arrays(arrays, "phrases"))
+        self.return_arrays = return_arrays
+
+        self.boxes = np.array(self.regions.columns["box"], dtype=np.float32)
+        self.boxes[:, 2:] += self.boxes[:, :2]
+        self.boxes.setflags(write=False)
+
+    def _annotation_sources(self) -> List[str]:
+        return [os.path.join(self.labels_dir, "via_region_data_final.json")]
+
+    def _parse_annotations(self) -> Dict[str, np.ndarray]:
+        with open(os.path.join(self.labels_dir, "via_region_data_final.json")) as fp:
+            region_data = json.load(fp)
+
+        file_names = []
+        phrases = {}
+        lengths = []
+        boxes = []
+        phrase_ids = []
+        for dat in region_data.values():
+            file_names.append(dat["filename"])
+            regions: dict = dat["regions"]
+            lengths.append(len(regions))
+            for v in regions.values():
+                shape_attributes = v["shape_attributes"]
+                assert shape_attributes["name"] == "rect"
+                boxes.append([
+                    int(shape_attributes["x"]),
+                    int(shape_attributes["y"]),
+                    int(shape_attributes["width"]),
+                    int(shape_attributes["height"]),
+                ])
+                phrase_ids.append(phrases.setdefault(str(v["region_attributes"]["phrase"]), len(phrases)))
+
+        regions = ObjectTable.from_lengths(lengths, {
+            "box": np.array(boxes, dtype=np.int32).reshape(-1, 4),
+            "phrase": np.array(phrase_ids, dtype=np.int32),
+        })
+        return {
+            **StringTable.from_strings(file_names).to_arrays("images.file_names"),
+            **regions.to_arrays("regions"),
+            **StringTable.from_strings(phrases).to_arrays("phrases"),
+        }
 
     def __len__(self):
-        return len(self.region_data)
-
-    def __getitem__(self, index: int) -> Tuple[Any, Any]:
-        dat = self.region_data.iloc[index]
-        image_id = dat["filename"]
-        image = Image.open(os.path.join(self.images_dir, image_id))
-
-        target = []
-        regions: dict = dat["regions"]
-        for (k, v) in regions.items():
-            shape_attributes = v["shape_attributes"]
-            assert shape_attributes["name"] == "rect"
-            x = int(shape_attributes["x"])
-            y = int(shape_attributes["y"])
-            w = int(shape_attributes["width"])
-            h = int(shape_attributes["height"])
-
-            phrase = str(v["region_attributes"]["phrase"])
-
-            target.append({
+        return len(self.image_files)
+
+    def _image_file(self, index: int) -> str:
+        return self.image_files.path(index)
+
+    def _load_target(self, index: int) -> Any:
+        return self._load_targets([index])[0]
+
+    def _load_targets(self, indices: List[int]) -> List[Any]:
+        lengths, regions = self.regions.gather(indices)
+        lengths = lengths.tolist()
+        phrases = [self.phrases[phrase] for phrase in regions["phrase"].tolist()]
+
+        if self.return_arrays:
+            # the end of every range minus its length, gather() has already wrapped negative indices
+            starts = (self.regions.offsets[1:][indices] - np.asarray(lengths, dtype=np.int64)).tolist()
+            return [
+                {"boxes": self.boxes[start:start + length], "phrases": image_phrases}
+                for start, length, image_phrases in zip(starts, lengths, split(phrases, lengths))
+            ]
+
+        target = [
+            {
                 "x": x,
                 "y": y,
                 "width": w,
                 "height": h,
                 "phrase": phrase,
-            })
-
-        if self.transform:
-            image, target = self.transform(image, target)
-
-        return image, target
+            }
+            for (x, y, w, h), phrase in zip(regions["box"].tolist(), phrases)
+        ]
+        return split(target, lengths)
+
+    def _query_arrays(self):
+        return self.regions.offsets, self.regions.columns["phrase"], self.phrases, self.boxes
+
+    def _scale_target(self, target: Any, sx: float, sy: float) -> Any:
+        if self.return_arrays:
+            return T.scale(target, sx, sy)
+        for region in target:
+            region["x"] *= sx
+            region["y"] *= sy
+            region["width"] *= sx
+            region["height"] *= sy
+        return target
 
     def _check_exists(self) -> bool:
         """Check if the data directory exists."""
-        folders = [self.labels_dir, self.images_dir]
+        folders = [self.images_dir] if self.bundle is not None else [self.images_dir, self.labels_dir]
         return all(os.path.isdir(folder) for folder in folders)
 
     @property
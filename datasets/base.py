@@ -0,0 +1,231 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+from torch.utils.data import Subset
+from torchvision.datasets import VisionDataset
+
+from .cache import CachedAnnotationsMixin
+from .profiling import StageProfiler
+from .query import QueryIndex
+from .stats import DatasetStatistics, load_statistics
+
+
+class ConstructionDataset(CachedAnnotationsMixin, VisionDataset):
+    """Base class of the construction datasets.
+
+    Subclasses implement :meth:`_image_file`, :meth:`_load_target` and :meth:`_scale_target`,
+    and can override :meth:`_load_targets` to gather the targets of a whole batch at once.
+
+    ``__getitems__`` is used by :class:`~torch.utils.data.DataLoader` to fetch a batch:
+    the images of the batch are opened and decoded concurrently on a thread pool of
+    ``io_threads`` threads (PIL releases the GIL while decoding).
+
+    ``transforms`` is applied to the image and target together, ``transform`` to the image
+    and ``target_transform`` to the target, as in :class:`~torchvision.datasets.VisionDataset`.
+
+    If ``max_side`` is set, images whose longer side exceeds it are scaled down to it and
+    the coordinates in the target are scaled to match. JPEG images are decoded at a
+    reduced scale directly (PIL draft mode). With ``resize_cache_dir`` the resized images
+    are also kept on disk and reused.
+
+    :meth:`query` selects samples by category, object count and box size from a
+    :class:`~datasets.query.QueryIndex` built on first use from :meth:`_query_arrays`, and
+    :meth:`statistics` aggregates the same arrays (see :mod:`datasets.stats`).
+
+    :meth:`enable_profiling` records the latency of opening and decoding images, building
+    targets and transforming samples, and the bytes of image files read, in a
+    :class:`~datasets.profiling.StageProfiler` shared with the ``DataLoader`` workers.
+    """
+
+    io_threads: int = min(8, os.cpu_count() or 1)
+    max_side: Optional[int] = None
+    resize_cache_dir: Optional[str] = None
+    profiler: Optional[StageProfiler] = None
+
+    def __getitem__(self, index: int) -> Tuple[Any, Any]:
+        index = self._normalize_index(index)
+        with self._stage("image"):
+            image, scale = self._load_image(index)
+            if self.profiler is not None:
+                # decode here, or the decoding would be timed as part of the transforms
+                image.load()
+        with self._stage("annotation"):
+            target = self._load_target(index)
+        if scale is not None:
+            target = self._scale_target(target, *scale)
+
+        if self.transforms is not None:
+            with self._stage("transform"):
+                image, target = self.transforms(image, target)
+
+        return image, target
+
+    def __getitems__(self, indices: Sequence[int]) -> List[Tuple[Any, Any]]:
+        indices = [self._normalize_index(index) for index in indices]
+        images = self._executor().map(self._decode_image, indices)
+        with self._stage("annotation", len(indices)):
+            targets = self._load_targets(indices)
+
+        samples = []
+        for (image, scale), target in zip(images, targets):
+            if scale is not None:
+                target = self._scale_target(target, *scale)
+            if self.transforms is not None:
+                with self._stage("transform"):
+                    image, target = self.transforms(image, target)
+            samples.append((image, target))
+        return samples
+
+    def _normalize_index(self, index: int) -> int:
+        """Return ``index`` counted from the start, the subclasses only ever see these indices."""
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return index
+
+    def enable_profiling(self, profiler: Optional[StageProfiler] = None) -> StageProfiler:
+        """Record the latency of every stage of loading a sample in ``profiler``, a new one by default.
+
+        Enable it before creating the ``DataLoader``, so that the workers share the profiler.
+        For example::
+
+            profiler = dataset.enable_profiling()
+            for batch in DataLoader(dataset, num_workers=4):
+                ...
+            print(profiler.summary())
+            print(profiler.to_prometheus(labels={"dataset": "MOCS"}))
+        """
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        if self.annotation_load_time is not None:
+            self.profiler.observe("load_annotations", self.annotation_load_time)
+        return self.profiler
+
+    def disable_profiling(self) -> None:
+        self.profiler = None
+
+    def _stage(self, stage: str, count: int = 1):
+        return nullcontext() if self.profiler is None else self.profiler.time(stage, count)
+
+    def query(self, **kwargs) -> Subset:
+        """Return the subset of the samples matching :meth:`~datasets.query.QueryIndex.select`.
+
+        For example ``dataset.query(categories=["excavator"], min_objects=2)``.
+        """
+        return Subset(self, self.query_index().select(**kwargs).tolist())
+
+    def query_index(self) -> QueryIndex:
+        if getattr(self, "_query_index", None) is None:
+            self._query_index = QueryIndex(*self._query_arrays())
+        return self._query_index
+
+    def _query_arrays(self) -> Tuple[np.ndarray, np.ndarray, Sequence[str], np.ndarray]:
+        """Return the object offsets of every sample and the category ids, category names and ``xyxy`` boxes."""
+        raise NotImplementedError
+
+    def statistics(
+            self,
+            cache: bool = True,
+            cache_dir: Optional[str] = None,
+            num_threads: Optional[int] = None
+    ) -> DatasetStatistics:
+        """Return the class, box size, keypoint and image size statistics.
+
+        See :func:`~datasets.stats.load_statistics`.
+        """
+        return load_statistics(self, cache, cache_dir, num_threads)
+
+    def _keypoint_arrays(self) -> Optional[Tuple[Sequence[str], np.ndarray]]:
+        """Return the keypoint names and the ``(N, K, 2)`` keypoints of keypoint datasets, else ``None``."""
+        return None
+
+    def _image_file(self, index: int) -> str:
+        raise NotImplementedError
+
+    def _load_target(self, index: int) -> Any:
+        raise NotImplementedError
+
+    def _load_targets(self, indices: List[int]) -> List[Any]:
+        return [self._load_target(index) for index in indices]
+
+    def _scale_target(self, target: Any, sx: float, sy: float) -> Any:
+        """Return ``target`` with all x coordinates multiplied by ``sx`` and y coordinates by ``sy``."""
+        raise NotImplementedError
+
+    def _load_image(self, index: int) -> Tuple[Image.Image, Optional[Tuple[float, float]]]:
+        """Open the image and return it with the ``(sx, sy)`` it was scaled by, ``None`` if not scaled."""
+        file = self._image_file(index)
+        image = Image.open(file)
+        if self.max_side is None or max(image.size) <= self.max_side:
+            self._count_bytes(file)
+            return image, None
+
+        width, height = image.size
+        ratio = self.max_side / max(width, height)
+        size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+
+        cached_file = None
+        if self.resize_cache_dir is not None:
+            cached_file = os.path.join(self.resize_cache_dir, str(self.max_side), os.path.relpath(file, self.root))
+            if _is_newer(cached_file, file):
+                image.close()
+                self._count_bytes(cached_file)
+                return Image.open(cached_file), (size[0] / width, size[1] / height)
+
+        image.draft(image.mode, size)
+        resized = image.resize(size, Image.BILINEAR)
+        image.close()
+        self._count_bytes(file)
+
+        if cached_file is not None:
+            _save_atomic(resized, cached_file)
+        return resized, (size[0] / width, size[1] / height)
+
+    def _decode_image(self, index: int) -> Tuple[Image.Image, Optional[Tuple[float, float]]]:
+        with self._stage("image"):
+            image, scale = self._load_image(index)
+            image.load()
+        return image, scale
+
+    def _count_bytes(self, file: str) -> None:
+        if self.profiler is not None:
+            self.profiler.add_bytes(os.path.getsize(file))
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # a pool created before a fork has no threads in the child, e.g. in DataLoader workers
+        if getattr(self, "_executor_pid", None) != os.getpid():
+            self._io_executor = ThreadPoolExecutor(max_workers=self.io_threads)
+            self._executor_pid = os.getpid()
+        return self._io_executor
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop("_io_executor", None)
+        state.pop("_executor_pid", None)
+        return state
+
+
+def _is_newer(file: str, source: str) -> bool:
+    """Return whether ``file`` exists and was written after ``source`` last changed."""
+    try:
+        return os.stat(file).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+
+def _save_atomic(image: Image.Image, file: str) -> None:
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    root, extension = os.path.splitext(file)
+    tmp = f"{root}.tmp-{os.getpid()}-{threading.get_ident()}{extension}"
+    try:
+        image.save(tmp, quality=90)
+        os.replace(tmp, file)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,77 @@
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+from .cache import AnnotationCache
+from .compact import StringTable
+from .manifest import MANIFEST_VERSION, FileManifest
+
+BUNDLE_FORMAT = 1
+BUNDLE_FILE = "bundle.json"
+MANIFEST_NAME = "images.manifest"
+STATISTICS_NAME = "statistics.stats"
+SHARDS_NAME = "shards"
+
+
+class Bundle:
+    """A dataset compiled by :mod:`datasets.compile` into one relocatable directory.
+
+    The directory holds ``bundle.json``, the parsed annotations in the format of the
+    annotation cache (``<name>.cache/``), a manifest of the image files with their sizes
+    (``images.manifest/``) and optionally the dataset statistics (``statistics.stats/``)
+    and image shards (``shards/``, see :class:`~datasets.ShardedDataset`). All paths are
+    relative, so the bundle can be copied anywhere, and its arrays are memory-mapped
+    without looking at the source files.
+
+    Args:
+        path (string): Directory of the bundle.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        try:
+            with open(os.path.join(path, BUNDLE_FILE)) as fp:
+                self.meta = json.load(fp)
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"{path} is not a dataset bundle: {e}")
+        if self.meta.get("format") != BUNDLE_FORMAT:
+            raise RuntimeError(f"Bundle {path} has format {self.meta.get('format')}, compile it again")
+
+    @classmethod
+    def for_dataset(cls, path: str, dataset) -> "Bundle":
+        """Open the bundle at ``path`` and check that it was compiled from the same dataset and split."""
+        bundle = cls(path)
+        compiled = (bundle.meta.get("dataset"), bundle.meta.get("split"))
+        expected = (dataset.__class__.__name__, getattr(dataset, "split", None))
+        if compiled != expected:
+            raise ValueError(f"Bundle {path} holds {compiled}, not {expected}")
+        return bundle
+
+    def annotations(self, name: str, version: int) -> Dict[str, np.ndarray]:
+        """Return the annotation arrays ``name`` parsed by version ``version`` of the parser."""
+        arrays = AnnotationCache(os.path.join(self.path, f"{name}.cache"), [], version).load(check_sources=False)
+        if arrays is None:
+            raise RuntimeError(f"Bundle {self.path} has no annotations {name} of version {version}, compile it again")
+        return arrays
+
+    def manifest(self, directory: str) -> FileManifest:
+        """Return the manifest of the image files, relative to ``directory``."""
+        arrays = AnnotationCache(os.path.join(self.path, MANIFEST_NAME), [], MANIFEST_VERSION).load(check_sources=False)
+        if arrays is None:
+            raise RuntimeError(f"Bundle {self.path} has no image manifest, compile it again")
+        return FileManifest(directory, StringTable.from_arrays(arrays, "names"), arrays.get("sizes"))
+
+    def statistics(self, version: int) -> Optional[Dict[str, np.ndarray]]:
+        """Return the arrays of the compiled :class:`~datasets.DatasetStatistics`, ``None`` if there are none."""
+        if not self.meta.get("statistics"):
+            return None
+        return AnnotationCache(os.path.join(self.path, STATISTICS_NAME), [], version).load(check_sources=False)
+
+    @property
+    def shards_dir(self) -> Optional[str]:
+        return os.path.join(self.path, SHARDS_NAME) if self.meta.get("shards") else None
+
+    def __len__(self) -> int:
+        return self.meta["num_images"]
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import warnings
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .compact import ArrayStore
+
+if TYPE_CHECKING:
+    from .bundle import Bundle
+
+CACHE_FORMAT = 1
+
+
+class AnnotationCache:
+    """Versioned on-disk cache of parsed annotation arrays.
+
+    Every array is stored as its own ``.npy`` file in the ``path`` directory and is
+    loaded back with ``np.load(mmap_mode="r")``, so all processes reading the same
+    cache (e.g. ``DataLoader`` workers) share its pages through the OS page cache.
+
+    ``meta.json`` records the cache format, the ``version`` of the parser and the size,
+    mtime and sha1 of the ``sources`` the arrays were parsed from. When the size or mtime
+    of a source changed, its content is hashed again and the cache is only reused if
+    the content is unchanged. The ``stat_sources`` are never hashed, the cache is stale
+    as soon as the size or mtime of any of them changed.
+
+    Args:
+        path (string): Directory of the cache.
+        sources (sequence): Files the cached arrays are parsed from.
+        version (int, optional): Version of the parser, bump it when the arrays change.
+        stat_sources (sequence, optional): Files only checked by size and mtime, e.g. the
+            images of a dataset, which are too large to hash.
+    """
+
+    def __init__(self, path: str, sources: Sequence[str], version: int = 1, stat_sources: Sequence[str] = ()) -> None:
+        self.path = path
+        self.sources = list(sources)
+        self.version = version
+        self.stat_sources = list(stat_sources)
+
+    @property
+    def meta_file(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def load(self, check_sources: bool = True) -> Optional[Dict[str, np.ndarray]]:
+        """Return the memory-mapped arrays, or ``None`` if the cache is missing or stale.
+
+        Without ``check_sources`` the sources are not looked at, only the format and version,
+        e.g. for a :class:`~datasets.bundle.Bundle` used where the sources do not exist.
+        """
+        try:
+            with open(self.meta_file) as fp:
+                meta = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        if meta.get("format") != CACHE_FORMAT or meta.get("version") != self.version:
+            return None
+
+        if check_sources:
+            recorded = meta.get("sources", [])
+            if [source["name"] for source in recorded] != [os.path.basename(source) for source in self.sources]:
+                return None
+            if not self._check_stat_sources(meta.get("stat_sources", [])) or not self._check_sources(meta):
+                return None
+
+        return self._map(meta["arrays"])
+
+    def _check_stat_sources(self, recorded: List[dict]) -> bool:
+        if [source["name"] for source in recorded] != [os.path.basename(source) for source in self.stat_sources]:
+            return False
+        try:
+            return all(
+                source["size"] == stat.st_size and source["mtime_ns"] == stat.st_mtime_ns
+                for source, stat in zip(recorded, map(os.stat, self.stat_sources))
+            )
+        except OSError:
+            return False
+
+    def _check_sources(self, meta: dict) -> bool:
+        """Return whether the sources recorded in ``meta`` are unchanged."""
+        recorded = meta["sources"]
+        try:
+            stats = [os.stat(source) for source in self.sources]
+        except OSError:
+            return False
+
+        fresh = all(
+            source["size"] == stat.st_size and source["mtime_ns"] == stat.st_mtime_ns
+            for source, stat in zip(recorded, stats)
+        )
+        if not fresh:
+            if [source["sha1"] for source in recorded] != [_sha1(source) for source in self.sources]:
+                return False
+            # only touched, remember the new mtimes to skip hashing next time
+            for source, stat in zip(recorded, stats):
+                source["size"], source["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            try:
+                _write_json(self.meta_file, meta)
+            except OSError:
+                pass
+        return True
+
+    def save(self, arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Write ``arrays`` to the cache and return them memory-mapped.
+
+        If the cache cannot be written (e.g. on a read-only mount) a warning is issued
+        and ``arrays`` are returned unchanged.
+        """
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+
+            meta = {
+                "format": CACHE_FORMAT,
+                "version": self.version,
+                "sources": self._describe_sources(),
+                "stat_sources": [_describe_stat(source) for source in self.stat_sources],
+                "arrays": list(arrays),
+            }
+            _write_json(os.path.join(tmp, "meta.json"), meta)
+
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            warnings.warn(f"Could not write annotation cache {self.path}: {e}")
+            return arrays
+
+        return self._map(meta["arrays"])
+
+    def _describe_sources(self) -> List[dict]:
+        sources = []
+        for source in self.sources:
+            stat = os.stat(source)
+            sources.append({
+                "name": os.path.basename(source),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha1": _sha1(source),
+            })
+        return sources
+
+    def _map(self, names: Sequence[str]) -> Dict[str, np.ndarray]:
+        return {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r") for name in names}
+
+
+class DirectoryCache(AnnotationCache):
+    """:class:`AnnotationCache` of arrays listed from directories, e.g. a :class:`~datasets.manifest.FileManifest`.
+
+    The mtime of a directory changes whenever an entry is added, removed or renamed, so
+    it is all that is checked, with a single ``stat`` per directory. Files rewritten in
+    place are not noticed. Call :meth:`snapshot` before listing the directories, so that
+    a change made while listing invalidates the saved arrays.
+    """
+
+    def snapshot(self) -> None:
+        self._mtimes = self._current_mtimes()
+
+    def _check_sources(self, meta: dict) -> bool:
+        try:
+            return [source["mtime_ns"] for source in meta["sources"]] == self._current_mtimes()
+        except OSError:
+            return False
+
+    def _describe_sources(self) -> List[dict]:
+        mtimes = getattr(self, "_mtimes", None) or self._current_mtimes()
+        return [{"name": os.path.basename(source), "mtime_ns": mtime} for source, mtime in zip(self.sources, mtimes)]
+
+    def _current_mtimes(self) -> List[int]:
+        return [os.stat(source).st_mtime_ns for source in self.sources]
+
+
+class CachedAnnotationsMixin(ArrayStore):
+    """Adds a persistent annotation cache to a :class:`~torchvision.datasets.VisionDataset`.
+
+    Subclasses list the files their annotations are parsed from in
+    :meth:`_annotation_sources`, parse them into a dict of numpy arrays in
+    :meth:`_parse_annotations` and get the arrays from :meth:`_load_annotations`.
+    Bump ``annotation_version`` whenever the parsed arrays change. The time the last
+    :meth:`_load_annotations` took is kept in ``annotation_load_time``, in seconds.
+
+    Like any :class:`~datasets.compact.ArrayStore`, the dataset pickles memory-mapped
+    arrays by file name.
+    """
+
+    annotation_version: int = 1
+    annotation_load_time: Optional[float] = None
+    bundle: Optional["Bundle"] = None
+
+    def _annotation_sources(self) -> List[str]:
+        raise NotImplementedError
+
+    def _parse_annotations(self) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def _load_annotations(
+            self,
+            name: str,
+            cache: bool = True,
+            cache_dir: Optional[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """Return the parsed annotations, from the cache ``<cache_dir>/<name>.cache`` if ``cache`` is set.
+
+        ``cache_dir`` defaults to the ``labels_dir`` of the dataset. If the dataset has a
+        ``bundle``, the annotations are loaded from it and ``cache`` is ignored.
+        """
+        tic = time.perf_counter()
+        if self.bundle is not None:
+            arrays = self.bundle.annotations(name, self.annotation_version)
+        elif not cache:
+            arrays = self._parse_annotations()
+        else:
+            if cache_dir is None:
+                cache_dir = self.labels_dir
+            annotation_cache = AnnotationCache(
+                os.path.join(cache_dir, f"{name}.cache"), self._annotation_sources(), self.annotation_version
+            )
+            arrays = annotation_cache.load()
+            if arrays is None:
+                arrays = annotation_cache.save(self._parse_annotations())
+        self.annotation_load_time = time.perf_counter() - tic
+        return arrays
+
+
+def _describe_stat(file: str) -> dict:
+    stat = os.stat(file)
+    return {"name": os.path.basename(file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _sha1(file: str) -> str:
+    digest = hashlib.sha1()
+    with open(file, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json(file: str, obj: dict) -> None:
+    with open(file, "w") as fp:
+        json.dump(obj, fp)
@@ -0,0 +1,386 @@
+from array import array
+from collections.abc import Mapping, Sequence as SequenceABC
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+
+class ArrayStore:
+    """Base of the array-backed stores.
+
+    Arrays memory-mapped from an :class:`~datasets.cache.AnnotationCache` are pickled by
+    file name and mapped again on unpickling, so that spawned ``DataLoader`` workers
+    share the cache pages instead of receiving a copy of the data.
+    """
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {name: _pack(value) for name, value in self.__dict__.items()}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update({name: _unpack(value) for name, value in state.items()})
+
+
+class _MappedFile(str):
+    """Path of a memory-mapped array in a pickled :class:`ArrayStore`."""
+
+
+def _pack(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _pack(v) for k, v in value.items()}
+    if isinstance(value, np.memmap) and value.filename is not None and value.mode == "r":
+        return _MappedFile(value.filename)
+    return value
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _unpack(v) for k, v in value.items()}
+    if isinstance(value, _MappedFile):
+        return np.load(value, mmap_mode="r")
+    return value
+
+
+class StringTable(ArrayStore, SequenceABC):
+    """Immutable sequence of strings packed into one utf-8 buffer plus offsets.
+
+    Args:
+        data (np.ndarray): The encoded strings back to back, ``uint8``.
+        offsets (np.ndarray): Start of every string in ``data`` and the end of the last one.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray) -> None:
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, _offsets([len(s) for s in encoded]))
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "StringTable":
+        return cls(arrays[f"{prefix}.data"], arrays[f"{prefix}.offsets"])
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}.data": self.data, f"{prefix}.offsets": self.offsets}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class ObjectTable(ArrayStore, SequenceABC):
+    """Objects of every image stored column-wise in flat arrays.
+
+    ``table[i]`` maps every column name to the rows of the objects of image ``i``.
+
+    Args:
+        offsets (np.ndarray): Object range of every image, shape ``(M + 1,)``.
+        columns (dict): Per-object arrays, all of length ``N``.
+    """
+
+    def __init__(self, offsets: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        self.offsets = offsets
+        self.columns = columns
+
+    @classmethod
+    def from_lengths(cls, lengths: Sequence[int], columns: Dict[str, np.ndarray]) -> "ObjectTable":
+        return cls(_offsets(lengths), columns)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "ObjectTable":
+        columns = {
+            name[len(prefix) + 1:]: array
+            for name, array in arrays.items()
+            if name.startswith(f"{prefix}.") and name != f"{prefix}.offsets"
+        }
+        return cls(arrays[f"{prefix}.offsets"], columns)
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        arrays = {f"{prefix}.offsets": self.offsets}
+        arrays.update({f"{prefix}.{name}": array for name, array in self.columns.items()})
+        return arrays
+
+    def __getitem__(self, index: int) -> Dict[str, np.ndarray]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, stop = int(self.offsets[index]), int(self.offsets[index + 1])
+        return {name: array[start:stop] for name, array in self.columns.items()}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def gather(self, indices: Sequence[int]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Return the number of objects of every image in ``indices`` and all their rows concatenated."""
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = np.where(indices < 0, indices + len(self), indices)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError(f"index out of range for {len(self)} images")
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+        rows = _ranges(starts, lengths)
+        return lengths, {name: array[rows] for name, array in self.columns.items()}
+
+
+class MOCSTargets(ArrayStore, Mapping):
+    """Read-only mapping from a MOCS image id to its list of targets.
+
+    All annotations of a split are held in a few flat arrays instead of one dict and
+    one small array per object. The ``{"segmentation", "bbox", "category"}`` dicts of
+    an image are only built when the image is looked up, and the segmentation parts
+    are read-only views into ``vertices``.
+
+    Like the parsed json, every part keeps its own type: when ``vertices`` are float, the
+    parts that only had integers are returned as int64 (read-only) copies, and the values of
+    a box that were integers as ints.
+
+    Args:
+        image_ids (np.ndarray): Sorted ids of the images that have annotations, shape ``(M,)``.
+        image_offsets (np.ndarray): Annotation range of every image, shape ``(M + 1,)``.
+        bboxes (np.ndarray): Box of every annotation in COCO ``xywh`` format, shape ``(N, 4)``.
+        category_ids (np.ndarray): Index into ``categories`` of every annotation, shape ``(N,)``.
+        part_offsets (np.ndarray): Segmentation part range of every annotation, shape ``(N + 1,)``.
+        vertex_offsets (np.ndarray): Vertex range of every segmentation part, shape ``(P + 1,)``.
+        vertices (np.ndarray): Polygon vertices of all parts, shape ``(V, 2)``.
+        float_bbox_values (np.ndarray): Which values of the boxes were floats, shape ``(N, 4)``.
+        float_parts (np.ndarray): Which segmentation parts had a float, shape ``(P,)``.
+        categories (list): Category names.
+    """
+
+    _ARRAYS = (
+        "image_ids",
+        "image_offsets",
+        "bboxes",
+        "category_ids",
+        "part_offsets",
+        "vertex_offsets",
+        "vertices",
+        "float_bbox_values",
+        "float_parts",
+    )
+
+    def __init__(
+            self,
+            image_ids: np.ndarray,
+            image_offsets: np.ndarray,
+            bboxes: np.ndarray,
+            category_ids: np.ndarray,
+            part_offsets: np.ndarray,
+            vertex_offsets: np.ndarray,
+            vertices: np.ndarray,
+            float_bbox_values: np.ndarray,
+            float_parts: np.ndarray,
+            categories: Sequence[str],
+    ) -> None:
+        self.image_ids = image_ids
+        self.image_offsets = image_offsets
+        self.bboxes = bboxes
+        self.category_ids = category_ids
+        self.part_offsets = part_offsets
+        self.vertex_offsets = vertex_offsets
+        self.vertices = vertices
+        self.float_bbox_values = float_bbox_values
+        self.float_parts = float_parts
+        self.categories = list(categories)
+
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            if array.flags.writeable:
+                array.setflags(write=False)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str = "targets") -> "MOCSTargets":
+        categories = StringTable.from_arrays(arrays, f"{prefix}.categories")
+        return cls(*(arrays[f"{prefix}.{name}"] for name in cls._ARRAYS), categories=categories)
+
+    def to_arrays(self, prefix: str = "targets") -> Dict[str, np.ndarray]:
+        arrays = {f"{prefix}.{name}": getattr(self, name) for name in self._ARRAYS}
+        arrays.update(StringTable.from_strings(self.categories).to_arrays(f"{prefix}.categories"))
+        return arrays
+
+    def to_dict(self) -> Dict[int, List[Dict[str, Any]]]:
+        """Build all targets as a plain dict of lists, with writable copies of the segmentation parts."""
+        targets = {}
+        for image_id, image_targets in self.items():
+            for target in image_targets:
+                target["segmentation"] = [np.array(part) for part in target["segmentation"]]
+            targets[image_id] = image_targets
+        return targets
+
+    @classmethod
+    def from_annotations(cls, annotations: Iterable[Dict[str, Any]], categories: Dict[int, str]) -> "MOCSTargets":
+        """Build the arrays from the ``annotations`` and ``categories`` of a COCO style json file."""
+        builder = MOCSTargetsBuilder()
+        for annotation in annotations:
+            builder.add(annotation)
+        return builder.build(categories)
+
+    def __getitem__(self, image_id: int) -> List[Dict[str, Any]]:
+        start, stop = self._range(image_id)
+        return [self._target(i) for i in range(start, stop)]
+
+    def arrays(self, image_id: int) -> Dict[str, Any]:
+        """Return the targets of an image as arrays, empty if it has no annotations.
+
+        The result holds ``"boxes"`` in ``xyxy`` format, the ``"categories"`` names, the vertices
+        of all segmentation parts in ``"polygons"``, the vertex range of every part in
+        ``"polygon_offsets"`` and the part range of every object in ``"part_offsets"``.
+        """
+        try:
+            start, stop = self._range(image_id)
+        except KeyError:
+            start = stop = 0
+
+        boxes = np.array(self.bboxes[start:stop], dtype=np.float32).reshape(-1, 4)
+        boxes[:, 2:] += boxes[:, :2]
+        first, last = int(self.part_offsets[start]), int(self.part_offsets[stop])
+        polygon_offsets = self.vertex_offsets[first:last + 1] - self.vertex_offsets[first]
+        vertices = self.vertices[self.vertex_offsets[first]:self.vertex_offsets[last]]
+        return {
+            "boxes": boxes,
+            "categories": [self.categories[category] for category in self.category_ids[start:stop].tolist()],
+            "polygons": np.asarray(vertices, dtype=np.float32),
+            "polygon_offsets": polygon_offsets,
+            "part_offsets": self.part_offsets[start:stop + 1] - first,
+        }
+
+    def rows(self, image_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the number of objects of every image and the rows of all these objects, in order."""
+        image_ids = np.asarray(image_ids, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self.image_ids, image_ids), max(len(self.image_ids) - 1, 0))
+        found = self.image_ids[rows] == image_ids if len(self.image_ids) else np.zeros(len(image_ids), dtype=bool)
+        starts = np.where(found, self.image_offsets[rows], 0)
+        lengths = np.where(found, self.image_offsets[rows + 1] - starts, 0)
+        return lengths, _ranges(starts, lengths)
+
+    def _range(self, image_id: int) -> Tuple[int, int]:
+        row = int(np.searchsorted(self.image_ids, image_id))
+        if row == len(self.image_ids) or self.image_ids[row] != image_id:
+            raise KeyError(image_id)
+        return int(self.image_offsets[row]), int(self.image_offsets[row + 1])
+
+    def _target(self, i: int) -> Dict[str, Any]:
+        first, last = int(self.part_offsets[i]), int(self.part_offsets[i + 1])
+        bounds = self.vertex_offsets[first:last + 1].tolist()
+        segmentation = [self.vertices[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+        bbox = self.bboxes[i].tolist()
+        if self.vertices.dtype.kind == "f":
+            for p, is_float in enumerate(self.float_parts[first:last].tolist()):
+                if not is_float:
+                    segmentation[p] = segmentation[p].astype(np.int64)
+                    segmentation[p].setflags(write=False)
+        if self.bboxes.dtype.kind == "f":
+            float_values = self.float_bbox_values[i].tolist()
+            bbox = [value if is_float else int(value) for value, is_float in zip(bbox, float_values)]
+        return {
+            "segmentation": segmentation,
+            "bbox": bbox,
+            "category": self.categories[self.category_ids[i]],
+        }
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.image_ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.image_ids)
+
+
+class MOCSTargetsBuilder:
+    """Collects COCO annotations one at a time into flat typed buffers.
+
+    Memory grows with the size of the resulting :class:`MOCSTargets` only, so annotations
+    can be streamed in without holding the json document.
+    """
+
+    def __init__(self) -> None:
+        self.image_ids = array("q")
+        self.category_ids = array("q")
+        self.bboxes = array("d")
+        self.part_sizes = array("q")
+        self.vertex_sizes = array("q")
+        self.coordinates = array("d")
+        # json ints stay ints, as with np.asarray on the parsed lists
+        self.float_bbox_values = array("b")
+        self.float_parts = array("b")
+
+    def add(self, annotation: Dict[str, Any]) -> None:
+        bbox = annotation["bbox"]
+        self.image_ids.append(annotation["image_id"])
+        self.category_ids.append(int(annotation["category_id"]))
+        self.bboxes.extend(bbox)
+        self.float_bbox_values.extend(type(v) is float for v in bbox)
+        self.part_sizes.append(len(annotation["segmentation"]))
+        for part in annotation["segmentation"]:
+            self.vertex_sizes.append(len(part) // 2)
+            self.coordinates.extend(part)
+            self.float_parts.append(any(type(v) is float for v in part))
+
+    def build(self, categories: Dict[int, str]) -> MOCSTargets:
+        image_ids = np.frombuffer(self.image_ids, dtype=np.int64)
+        part_sizes = np.frombuffer(self.part_sizes, dtype=np.int64)
+        vertex_sizes = np.frombuffer(self.vertex_sizes, dtype=np.int64)
+
+        # annotations are grouped by image, keeping the file order within an image
+        order = np.argsort(image_ids, kind="stable")
+        part_offsets = _offsets(part_sizes)
+        vertex_offsets = _offsets(vertex_sizes)
+        parts = _ranges(part_offsets[:-1][order], part_sizes[order])
+        vertices = _ranges(vertex_offsets[:-1][parts], vertex_sizes[parts])
+
+        category_index = {category_id: i for i, category_id in enumerate(categories)}
+        raw_category_ids = np.frombuffer(self.category_ids, dtype=np.int64)[order]
+        raw_category_ids, inverse = np.unique(raw_category_ids, return_inverse=True)
+        category_ids = np.array([category_index[c] for c in raw_category_ids.tolist()], dtype=np.int32)[inverse]
+
+        bboxes = np.frombuffer(self.bboxes, dtype=np.float64).reshape(-1, 4)[order]
+        coordinates = np.frombuffer(self.coordinates, dtype=np.float64).reshape(-1, 2)[vertices]
+        float_bbox_values = np.frombuffer(self.float_bbox_values, dtype=np.int8).astype(bool).reshape(-1, 4)[order]
+        float_parts = np.frombuffer(self.float_parts, dtype=np.int8).astype(bool)[parts]
+
+        unique_ids, first = np.unique(image_ids[order], return_index=True)
+        return MOCSTargets(
+            image_ids=unique_ids,
+            image_offsets=np.append(first, len(order)).astype(np.int64),
+            bboxes=bboxes if float_bbox_values.any() else bboxes.astype(np.int64),
+            category_ids=category_ids.reshape(-1),
+            part_offsets=_offsets(part_sizes[order]),
+            vertex_offsets=_offsets(vertex_sizes[parts]),
+            vertices=coordinates if float_parts.any() else coordinates.astype(np.int64),
+            float_bbox_values=float_bbox_values,
+            float_parts=float_parts,
+            categories=list(categories.values()),
+        )
+
+
+def split(items: Sequence[Any], lengths: Sequence[int]) -> List[Sequence[Any]]:
+    """Split ``items`` into consecutive chunks of the given ``lengths``."""
+    chunks = []
+    start = 0
+    for length in lengths:
+        chunks.append(items[start:start + length])
+        start += length
+    return chunks
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenate ``range(start, start + length)`` for every pair without a python loop."""
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths - starts, lengths)
+
+
+def _offsets(sizes) -> np.ndarray:
+    """Turn a sequence of sizes into ``len(sizes) + 1`` start offsets."""
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    return offsets
@@ -0,0 +1,168 @@
+"""Compile a dataset into a relocatable bundle.
+
+    python -m datasets.compile MOCS data/ bundles/MOCS-train --split train
+    python -m datasets.compile ACID data/ bundles/ACID --shards
+
+The source annotations (xml, csv or json) are parsed once into memory-mappable arrays,
+next to a manifest of the image files and the dataset statistics, and with ``--shards``
+the images and targets are also packed into tar shards. Nothing is written next to the
+source data. Load the bundle with the ``bundle`` argument of the dataset, e.g.
+``MOCS("data/", "train", bundle="bundles/MOCS-train")``, or stream its shards with
+:class:`~datasets.ShardedDataset`.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from .bundle import BUNDLE_FILE, BUNDLE_FORMAT, MANIFEST_NAME, SHARDS_NAME, STATISTICS_NAME, Bundle
+from .cache import AnnotationCache
+from .compact import StringTable
+from .manifest import MANIFEST_VERSION, FileManifest
+
+DATASETS = ("ACID", "Bang2020", "Luo2020", "MOCS")
+
+
+def compile_bundle(
+        name: str,
+        root: str,
+        path: str,
+        split: Optional[str] = None,
+        shards: bool = False,
+        shard_size: int = 256 << 20,
+        statistics: bool = True,
+        num_workers: Optional[int] = None
+) -> Bundle:
+    """Compile dataset ``name`` under ``root`` into a bundle at ``path``, replacing any bundle there.
+
+    ``path`` must not exist, be empty or hold a bundle, any other directory is left alone.
+
+    Args:
+        name (string): One of ``ACID``, ``Bang2020``, ``Luo2020`` and ``MOCS``.
+        root (string): Root directory of the dataset, as passed to the dataset class.
+        path (string): Output directory of the bundle.
+        split (string, optional): The split of MOCS.
+        shards (bool, optional): If True, the images and targets are packed into tar shards
+            with :func:`~datasets.export_shards`.
+        shard_size (int, optional): Size in bytes after which a new shard is started.
+        statistics (bool, optional): If True, the dataset statistics are computed and stored.
+        num_workers (int, optional): Number of processes parsing the ACID xml files.
+    """
+    import datasets
+
+    if name not in DATASETS:
+        raise ValueError(f"Unknown dataset {name}, expected one of {', '.join(DATASETS)}")
+    if (split is not None) != (name == "MOCS"):
+        raise ValueError("A split is required for MOCS, and only for MOCS")
+    if os.path.lexists(path) and not _is_replaceable(path):
+        raise FileExistsError(f"{path} exists and is not a dataset bundle, it is not replaced")
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    # built next to its destination and moved into place once complete
+    tmp = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.tmp-", dir=parent)
+    try:
+        # the annotation cache is written to the bundle instead of next to the sources
+        options = {"cache": True, "cache_dir": tmp}
+        if name == "ACID":
+            options.update(eager=True, num_workers=num_workers)
+        if split is not None:
+            options["split"] = split
+        dataset = getattr(datasets, name)(root, **options)
+        # only the annotation caches are kept, e.g. not the cached listing of ACID
+        annotations = sorted(entry[:-len(".cache")] for entry in os.listdir(tmp) if entry.endswith(".cache"))
+        for entry in os.listdir(tmp):
+            if not entry.endswith(".cache"):
+                shutil.rmtree(os.path.join(tmp, entry))
+
+        files = [dataset._image_file(i) for i in range(len(dataset))]
+        manifest = FileManifest(
+            dataset.images_dir,
+            StringTable.from_strings(os.path.relpath(file, dataset.images_dir) for file in files),
+            np.array([os.path.getsize(file) for file in files], dtype=np.int64),
+        )
+        _save(os.path.join(tmp, MANIFEST_NAME), manifest.to_arrays(), MANIFEST_VERSION)
+
+        if statistics:
+            from .stats import STATS_VERSION, compute_statistics
+
+            _save(os.path.join(tmp, STATISTICS_NAME), compute_statistics(dataset).to_arrays(), STATS_VERSION)
+        if shards:
+            datasets.export_shards(dataset, os.path.join(tmp, SHARDS_NAME), shard_size)
+
+        with open(os.path.join(tmp, BUNDLE_FILE), "w") as fp:
+            json.dump({
+                "format": BUNDLE_FORMAT,
+                "dataset": name,
+                "split": split,
+                "num_images": len(dataset),
+                "annotations": annotations,
+                "statistics": statistics,
+                "shards": shards,
+            }, fp, indent=2)
+
+        if os.path.lexists(path):
+            # checked again, the directory could have changed while compiling
+            if not _is_replaceable(path):
+                raise FileExistsError(f"{path} exists and is not a dataset bundle, it is not replaced")
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return Bundle(path)
+
+
+def _is_replaceable(path: str) -> bool:
+    """Return whether ``path`` is an empty directory or a bundle."""
+    if os.path.islink(path) or not os.path.isdir(path):
+        return False
+    entries = os.listdir(path)
+    return not entries or os.path.isfile(os.path.join(path, BUNDLE_FILE))
+
+
+def _save(path: str, arrays: Dict[str, np.ndarray], version: int) -> None:
+    # a cache without sources, which is never stale
+    AnnotationCache(path, [], version).save(arrays)
+    if not os.path.isdir(path):
+        raise OSError(f"Could not write {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile a construction dataset into a relocatable bundle")
+    parser.add_argument("dataset", choices=DATASETS, help="dataset to compile")
+    parser.add_argument("root", help="root directory of the dataset")
+    parser.add_argument("output", help="output directory of the bundle")
+    parser.add_argument("--split", choices=["train", "val", "test"], help="split of MOCS")
+    parser.add_argument("--shards", action="store_true", help="also pack the images and targets into tar shards")
+    parser.add_argument("--shard-size", type=int, default=256, help="shard size in MiB")
+    parser.add_argument("--no-statistics", action="store_true", help="do not compute the dataset statistics")
+    parser.add_argument("--num-workers", type=int, help="number of processes parsing annotations")
+    args = parser.parse_args()
+
+    if args.dataset == "MOCS" and args.split is None:
+        parser.error("--split is required for MOCS")
+
+    tic = time.perf_counter()
+    try:
+        bundle = compile_bundle(
+            args.dataset,
+            args.root,
+            args.output,
+            split=args.split,
+            shards=args.shards,
+            shard_size=args.shard_size << 20,
+            statistics=not args.no_statistics,
+            num_workers=args.num_workers,
+        )
+    except FileExistsError as e:
+        parser.error(str(e))
+    print(f"Compiled {len(bundle)} images of {args.dataset} into {args.output} in {time.perf_counter() - tic:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
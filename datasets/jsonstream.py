@@ -0,0 +1,133 @@
+import json
+import re
+from typing import IO, Any, Container, Iterator, Tuple
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# what may still follow the prefix of a number, e.g. "2" of "2.5e-3"
+_NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*")
+
+
+def iter_arrays(fp: IO[str], keys: Container[str], chunk_size: int = 1 << 20) -> Iterator[Tuple[str, Any]]:
+    """Stream the elements of the arrays under ``keys`` of a top-level json object.
+
+    Yields ``(key, element)`` pairs in file order while only holding one chunk of the
+    file and one element in memory. The values of all other keys are skipped element by
+    element, so they are never held whole either.
+
+    Args:
+        fp (file): Text file positioned at the start of a json object.
+        keys (container): Keys whose array elements are yielded.
+        chunk_size (int, optional): Number of characters read at a time.
+    """
+    reader = _Reader(fp, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.decode()
+        reader.expect(":")
+        if key in keys and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.decode()
+                    if reader.next_char(",]") == "]":
+                        break
+        else:
+            reader.skip()
+
+        if reader.next_char(",}") == "}":
+            return
+
+
+class _Reader:
+    def __init__(self, fp: IO[str], chunk_size: int) -> None:
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read the next chunk, returns False at the end of the file."""
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                raise ValueError("Unexpected end of json file")
+
+    def next_char(self, expected: str) -> str:
+        char = self.peek()
+        if char not in expected:
+            raise ValueError(f"Expected one of {expected!r} but found {char!r}")
+        self.position += 1
+        return char
+
+    def expect(self, char: str) -> None:
+        self.next_char(char)
+
+    def decode(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number at the end of the buffer can continue in the next chunk
+            if self._at_end(value, end) and self._fill():
+                continue
+            self.position = end
+            return value
+
+    def skip(self) -> None:
+        """Move past the next value without holding more of it than the buffer."""
+        char = self.peek()
+        if char not in "[{":
+            self.decode()
+            return
+        # most values fit in the buffer and are decoded at once, the others are walked through
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.position)
+        except json.JSONDecodeError:
+            pass
+        else:
+            if not self._at_end(value, end):
+                self.position = end
+                return
+
+        close = "]" if char == "[" else "}"
+        self.expect(char)
+        if self.peek() == close:
+            self.expect(close)
+            return
+        while True:
+            if close == "}":
+                self.decode()
+                self.expect(":")
+            self.skip()
+            if self.next_char("," + close) == close:
+                return
+
+    def _at_end(self, value: Any, end: int) -> bool:
+        if end == len(self.buffer):
+            return True
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        return is_number and _NUMBER_TAIL.match(self.buffer, end).end() == len(self.buffer)
@@ -1,12 +1,16 @@
 import os.path
-from typing import Optional, Callable, Tuple, Any
+from typing import Optional, Callable, Any, Dict, List
 
-import pandas as pd
-from PIL import Image
-from torchvision.datasets import VisionDataset
+import numpy as np
 
+from .base import ConstructionDataset
+from .bundle import Bundle
+from . import transforms as T
+from .compact import StringTable
+from .manifest import FileManifest
 
-class Luo2020(VisionDataset):
+
+class Luo2020(ConstructionDataset):
     """`Luo2020
     <https://doi.org/10.1016/j.autcon.2019.103016>`_ Dataset.
 
@@ -19,6 +23,20 @@ class Luo2020(VisionDataset):
             and returns a transformed version. E.g, ``transforms.RandomCrop``
         target_transform (callable, optional): A function/transform that takes in the
             target and transforms it.
+        cache (bool, optional): If True, ``labels.csv`` is parsed once and cached as memory-mapped
+            arrays (see :class:`~datasets.cache.AnnotationCache`).
+        cache_dir (string, optional): Directory of the cache, defaults to the ``labels/`` directory.
+        return_arrays (bool, optional): If True, the target is ``{"keypoints": array, "keypoint_names": tuple}``
+            with a ``(K, 2)`` float32 array of the ``<name>_x``, ``<name>_y`` columns instead of a dict
+            of all columns.
+        max_side (int, optional): If set, images are scaled down so that their longer side is at
+            most ``max_side`` and the target is scaled to match. JPEG images are decoded at a
+            reduced scale directly.
+        resize_cache_dir (string, optional): If set together with ``max_side``, resized images are
+            stored in and reused from this directory.
+        bundle (string, optional): Directory of a bundle compiled by :mod:`datasets.compile`. The
+            annotations are memory-mapped from it instead of being parsed or cached, and the images
+            are still read from ``root``.
     """
 
     def __init__(
@@ -26,10 +44,19 @@ class Luo2020(VisionDataset):
             root: str,
             transforms: Optional[Callable] = None,
             transform: Optional[Callable] = None,
-            target_transform: Optional[Callable] = None
+            target_transform: Optional[Callable] = None,
+            cache: bool = False,
+            cache_dir: Optional[str] = None,
+            return_arrays: bool = False,
+            max_side: Optional[int] = None,
+            resize_cache_dir: Optional[str] = None,
+            bundle: Optional[str] = None
     ) -> None:
         super(Luo2020, self).__init__(root, transforms=transforms, transform=transform,
                                       target_transform=target_transform)
+        self.max_side = max_side
+        self.resize_cache_dir = resize_cache_dir
+        self.bundle = Bundle.for_dataset(bundle, self) if bundle is not None else None
 
         if not self._check_exists():
             raise RuntimeError(
@@ -38,24 +65,75 @@ class Luo2020(VisionDataset):
                 f"https://hkustbimlab.github.io/"
             )
 
-        self.labels = pd.read_csv(os.path.join(self.labels_dir, "labels.csv"))
+        arrays = self._load_annotations(self.__class__.__name__.lower(), cache, cache_dir)
+        self.image_files = FileManifest(self.images_dir, StringTable.from_arrays(arrays, "images.file_names"))
+        self.columns = list(StringTable.from_arrays(arrays, "labels.columns"))
+        self.values = arrays["labels.values"]
+        self.return_arrays = return_arrays
+
+        self.keypoint_names = tuple(
+            column[:-2] for column in self.columns
+            if column.endswith("_x") and f"{column[:-2]}_y" in self.columns
+        )
+        keypoint_columns = [
+            [self.columns.index(f"{name}_x"), self.columns.index(f"{name}_y")] for name in self.keypoint_names
+        ]
+        self.keypoints = np.asarray(self.values[:, keypoint_columns], dtype=np.float32)
+        self.keypoints = self.keypoints.reshape(len(self.values), len(self.keypoint_names), 2)
+        self.keypoints.setflags(write=False)
+
+    def _annotation_sources(self) -> List[str]:
+        return [os.path.join(self.labels_dir, "labels.csv")]
+
+    def _parse_annotations(self) -> Dict[str, np.ndarray]:
+        # pandas is only imported to parse the csv, not to load the cached arrays
+        import pandas as pd
+
+        labels = pd.read_csv(os.path.join(self.labels_dir, "labels.csv"))
+        return {
+            **StringTable.from_strings(labels.iloc[:, 0].astype(str)).to_arrays("images.file_names"),
+            **StringTable.from_strings(labels.columns[1:]).to_arrays("labels.columns"),
+            "labels.values": labels.iloc[:, 1:].to_numpy(),
+        }
 
     def __len__(self):
-        return len(self.labels)
+        return len(self.image_files)
+
+    def _image_file(self, index: int) -> str:
+        return self.image_files.path(index)
+
+    def _load_target(self, index: int) -> Dict[str, Any]:
+        if self.return_arrays:
+            return {"keypoints": self.keypoints[index], "keypoint_names": self.keypoint_names}
+        return dict(zip(self.columns, self.values[index].tolist()))
+
+    def _load_targets(self, indices: List[int]) -> List[Dict[str, Any]]:
+        if self.return_arrays:
+            return [
+                {"keypoints": keypoints, "keypoint_names": self.keypoint_names}
+                for keypoints in self.keypoints[indices]
+            ]
+        return [dict(zip(self.columns, row)) for row in self.values[indices].tolist()]
 
-    def __getitem__(self, index: int) -> Tuple[Any, Any]:
-        image_id = self.labels.iloc[index, 0]
-        image = Image.open(os.path.join(self.images_dir, image_id))
-        target = self.labels.iloc[index, 1:].to_dict()
+    def _keypoint_arrays(self):
+        return self.keypoint_names, self.keypoints
 
-        if self.transform:
-            image, target = self.transform(image, target)
+    def _query_arrays(self):
+        # one excavator per image, boxed by its keypoints
+        boxes = np.concatenate([self.keypoints.min(axis=1), self.keypoints.max(axis=1)], axis=1)
+        return np.arange(len(self) + 1), np.zeros(len(self), dtype=np.int64), ["excavator"], boxes
 
-        return image, target
+    def _scale_target(self, target: Dict[str, Any], sx: float, sy: float) -> Dict[str, Any]:
+        if self.return_arrays:
+            return T.scale(target, sx, sy)
+        for name in self.keypoint_names:
+            target[f"{name}_x"] *= sx
+            target[f"{name}_y"] *= sy
+        return target
 
     def _check_exists(self) -> bool:
         """Check if the data directory exists."""
-        folders = [self.images_dir, self.labels_dir]
+        folders = [self.images_dir] if self.bundle is not None else [self.images_dir, self.labels_dir]
         return all(os.path.isdir(folder) for folder in folders)
 
     @property
@@ -0,0 +1,84 @@
+import os
+from collections.abc import Sequence as SequenceABC
+from typing import Dict, Optional
+
+import numpy as np
+
+from .cache import DirectoryCache
+from .compact import ArrayStore, StringTable
+
+MANIFEST_VERSION = 1
+
+
+class FileManifest(ArrayStore, SequenceABC):
+    """Names of the files of a directory, packed into a :class:`~datasets.compact.StringTable`.
+
+    ``manifest[i]`` is the name of file ``i`` relative to ``directory`` and :meth:`path`
+    its full path, so a dataset keeps one buffer of names instead of a path string per
+    sample. A manifest loaded from the cache is memory-mapped, and pickles by file name
+    like the other array stores.
+
+    Args:
+        directory (string): Directory the names are relative to.
+        names (StringTable): File names, relative to ``directory``.
+        sizes (np.ndarray, optional): Size in bytes of every file.
+    """
+
+    def __init__(self, directory: str, names: StringTable, sizes: Optional[np.ndarray] = None) -> None:
+        self.directory = directory
+        self.names = names
+        self.sizes = sizes
+
+    @classmethod
+    def scan(cls, directory: str, sizes: bool = False) -> "FileManifest":
+        """List the regular files of ``directory`` with ``os.scandir``, sorted by name.
+
+        The file type comes with the directory entries, so only ``sizes`` costs a ``stat``
+        per file.
+        """
+        names, file_sizes = [], []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    names.append(entry.name)
+                    if sizes:
+                        file_sizes.append(entry.stat().st_size)
+
+        order = sorted(range(len(names)), key=names.__getitem__)
+        return cls(
+            directory,
+            StringTable.from_strings(names[i] for i in order),
+            np.array(file_sizes, dtype=np.int64)[order] if sizes else None,
+        )
+
+    @classmethod
+    def load(cls, directory: str, cache_file: Optional[str] = None, sizes: bool = False) -> "FileManifest":
+        """Return the manifest of ``directory``, from the cache ``cache_file`` if given.
+
+        The cache (see :class:`~datasets.cache.DirectoryCache`) is only validated by the
+        mtime of ``directory``, so a warm cache is loaded without listing the directory.
+        """
+        if cache_file is None:
+            return cls.scan(directory, sizes)
+
+        manifest_cache = DirectoryCache(cache_file, [directory], MANIFEST_VERSION)
+        arrays = manifest_cache.load()
+        if arrays is None or (sizes and "sizes" not in arrays):
+            manifest_cache.snapshot()
+            arrays = manifest_cache.save(cls.scan(directory, sizes).to_arrays())
+        return cls(directory, StringTable.from_arrays(arrays, "names"), arrays.get("sizes"))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = self.names.to_arrays("names")
+        if self.sizes is not None:
+            arrays["sizes"] = self.sizes
+        return arrays
+
+    def path(self, index: int) -> str:
+        return os.path.join(self.directory, self.names[index])
+
+    def __getitem__(self, index):
+        return self.names[index]
+
+    def __len__(self) -> int:
+        return len(self.names)
@@ -1,16 +1,19 @@
-import json
 import os.path
-import pickle
-import time
-from typing import Optional, Callable, Tuple, Any
+from array import array
+from typing import Optional, Callable, Any, Dict, List
 
 import numpy as np
-from PIL import Image
-from torchvision.datasets import VisionDataset
 from torchvision.datasets.utils import verify_str_arg
 
+from .base import ConstructionDataset
+from .bundle import Bundle
+from . import transforms as T
+from .compact import MOCSTargets, MOCSTargetsBuilder, StringTable, _offsets
+from .jsonstream import iter_arrays
+from .manifest import FileManifest
 
-class MOCS(VisionDataset):
+
+class MOCS(ConstructionDataset):
     """`MOCS
     <https://doi.org/10.1016/j.autcon.2020.103482>`_ Dataset.
 
@@ -24,22 +27,53 @@ class MOCS(VisionDataset):
             and returns a transformed version. E.g, ``transforms.RandomCrop``
         target_transform (callable, optional): A function/transform that takes in the
             target and transforms it.
+        compact (bool, optional): The annotations are always kept in flat arrays (see
+            :class:`~datasets.compact.MOCSTargets`), which are shared with the ``DataLoader``
+            workers, and the target of an image is only built when it is requested. If True, its
+            segmentation parts are read-only views of these arrays, otherwise writable copies.
+        return_arrays (bool, optional): If True, the target is a dict of arrays with ``xyxy`` boxes
+            and the polygon vertices of all objects (see :meth:`~datasets.compact.MOCSTargets.arrays`)
+            instead of a list of dicts. :mod:`datasets.transforms` works on these arrays.
+        cache (bool, optional): If True (default), the parsed annotations are cached as memory-mapped
+            arrays (see :class:`~datasets.cache.AnnotationCache`), which are rebuilt when the json file changes.
+        cache_dir (string, optional): Directory of the cache, defaults to ``MOCS/``.
+        max_side (int, optional): If set, images are scaled down so that their longer side is at
+            most ``max_side`` and the target is scaled to match. JPEG images are decoded at a
+            reduced scale directly.
+        resize_cache_dir (string, optional): If set together with ``max_side``, resized images are
+            stored in and reused from this directory.
+        bundle (string, optional): Directory of a bundle compiled by :mod:`datasets.compile`. The
+            annotations are memory-mapped from it instead of being parsed or cached, and the images
+            are still read from ``root``.
     """
 
+    annotation_version = 2
+
     def __init__(
             self,
             root: str,
             split: str = "train",
             transforms: Optional[Callable] = None,
             transform: Optional[Callable] = None,
-            target_transform: Optional[Callable] = None
+            target_transform: Optional[Callable] = None,
+            compact: bool = False,
+            return_arrays: bool = False,
+            cache: bool = True,
+            cache_dir: Optional[str] = None,
+            max_side: Optional[int] = None,
+            resize_cache_dir: Optional[str] = None,
+            bundle: Optional[str] = None
     ) -> None:
         self.split = verify_str_arg(split, "split", ["train", "test", "val"])
 
         super(MOCS, self).__init__(root, transforms=transforms, transform=transform,
                                    target_transform=target_transform)
+        self.max_side = max_side
+        self.resize_cache_dir = resize_cache_dir
+        self.bundle = Bundle.for_dataset(bundle, self) if bundle is not None else None
 
-        self.images = []
+        self.compact = compact
+        self.return_arrays = return_arrays
         self.targets = {}
 
         if not self._check_exists():
@@ -51,77 +85,81 @@ class MOCS(VisionDataset):
 
         file_name = f"instances_{self.split}" if self.split != "test" else f"image_info_test"
         self.json_file = os.path.join(self.labels_dir, f"{file_name}.json")
-        self.pkl_file = os.path.join(self.labels_dir, f"{file_name}.pkl")
-
-        tic = time.time()
-        try:
-            self._load_from_pickle()
-        except FileNotFoundError:
-            self._load_from_json()
-            self._save_to_pickle()
-        toc = time.time()
-        print(f"MOCS loaded in {(toc - tic) * 10000 // 10}ms")
-
-    def _load_from_json(self):
+
+        self._load_from_arrays(self._load_annotations(file_name, cache, cache_dir))
+
+    def _annotation_sources(self) -> List[str]:
+        return [self.json_file]
+
+    def _parse_annotations(self) -> Dict[str, np.ndarray]:
+        # the json is streamed, so peak memory stays close to the size of the parsed arrays
+        image_ids = array("q")
+        file_names = []
+        categories = {}
+        targets = MOCSTargetsBuilder()
+
+        keys = {"images", "categories"} if self.split == "test" else {"images", "categories", "annotations"}
         with open(self.json_file) as fp:
-            data = json.load(fp)
-            for image in data["images"]:
-                image_id = image["id"]
-                file_name = os.path.join(self.images_dir, image["file_name"])
-                self.images.append((image_id, file_name))
-
-            categories = {}
-            for category in data["categories"]:
-                category_id = category["id"]
-                category_name = category["name"]
-                categories[category_id] = category_name
-
-            if self.split != "test":
-                for annotation in data["annotations"]:
-                    image_id = annotation["image_id"]
-                    parts = []
-                    for part in annotation["segmentation"]:
-                        parts.append(np.reshape(np.array(part), (-1, 2)))
-
-                    target = {
-                        "segmentation": parts,
-                        "bbox": annotation["bbox"],
-                        "category": categories[int(annotation["category_id"])],
-                    }
-                    if image_id not in self.targets:
-                        self.targets[image_id] = []
-
-                    self.targets[image_id].append(target)
-
-    def _save_to_pickle(self):
-        with open(self.pkl_file, 'wb') as handle:
-            pickle.dump({
-                "images": self.images,
-                "targets": self.targets,
-            }, handle, protocol=pickle.HIGHEST_PROTOCOL)
-
-    def _load_from_pickle(self):
-        with open(self.pkl_file, 'rb') as handle:
-            data = pickle.load(handle)
-            self.images = data["images"]
-            self.targets = data["targets"]
+            for key, item in iter_arrays(fp, keys):
+                if key == "annotations":
+                    targets.add(item)
+                elif key == "images":
+                    image_ids.append(item["id"])
+                    file_names.append(item["file_name"])
+                else:
+                    categories[item["id"]] = item["name"]
+
+        return {
+            "images.ids": np.frombuffer(image_ids, dtype=np.int64),
+            **StringTable.from_strings(file_names).to_arrays("images.file_names"),
+            **targets.build(categories).to_arrays(),
+        }
+
+    def _load_from_arrays(self, arrays: Dict[str, np.ndarray]):
+        self.image_ids = arrays["images.ids"]
+        self.images = FileManifest(self.images_dir, StringTable.from_arrays(arrays, "images.file_names"))
+
+        self.store = MOCSTargets.from_arrays(arrays)
+        self.targets = self.store
 
     def __len__(self):
         return len(self.images)
 
-    def __getitem__(self, index: int) -> Tuple[Any, Any]:
-        image_id, image_file = self.images[index]
-        image = Image.open(image_file)
-        target = self.targets[image_id]
-
-        if self.transform:
-            image, target = self.transform(image, target)
-
-        return image, target
+    def _image_file(self, index: int) -> str:
+        return self.images.path(index)
+
+    def _load_target(self, index: int) -> Any:
+        image_id = int(self.image_ids[index])
+        if self.return_arrays:
+            return self.store.arrays(image_id)
+        target = self.targets.get(image_id, [])
+        if not self.compact:
+            for obj in target:
+                obj["segmentation"] = [np.array(part) for part in obj["segmentation"]]
+        return target
+
+    def _query_arrays(self):
+        lengths, rows = self.store.rows(self.image_ids)
+        boxes = np.array(self.store.bboxes[rows], dtype=np.float64).reshape(-1, 4)
+        boxes[:, 2:] += boxes[:, :2]
+        return _offsets(lengths), self.store.category_ids[rows], self.store.categories, boxes
+
+    def _scale_target(self, target: Any, sx: float, sy: float) -> Any:
+        if self.return_arrays:
+            return T.scale(target, sx, sy)
+        scale = np.array([sx, sy])
+        return [
+            {
+                **obj,
+                "segmentation": [part * scale for part in obj["segmentation"]],
+                "bbox": [obj["bbox"][0] * sx, obj["bbox"][1] * sy, obj["bbox"][2] * sx, obj["bbox"][3] * sy],
+            }
+            for obj in target
+        ]
 
     def _check_exists(self) -> bool:
         """Check if the data directory exists."""
-        folders = [self.images_dir, self.labels_dir]
+        folders = [self.images_dir] if self.bundle is not None else [self.images_dir, self.labels_dir]
         return all(os.path.isdir(folder) for folder in folders)
 
     @property
@@ -0,0 +1,135 @@
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, Iterable, Iterator, Optional, Sized, Tuple
+
+import torch
+from PIL import Image
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
+
+
+@dataclass
+class PrefetchStats:
+    """Counters of a :class:`Prefetcher`, summed over the ``DataLoader`` workers.
+
+    Attributes:
+        samples: Number of samples yielded.
+        stalls: Number of times the consumer had to wait for a sample.
+        stall_time: Total time spent waiting, in seconds.
+        ready: Sum over all yields of the number of samples already decoded at that time.
+    """
+
+    samples: int = 0
+    stalls: int = 0
+    stall_time: float = 0.0
+    ready: int = 0
+
+    @property
+    def mean_queue_depth(self) -> float:
+        """Average number of decoded samples waiting in the queue when a sample is taken."""
+        return self.ready / self.samples if self.samples else 0.0
+
+
+class Prefetcher(IterableDataset):
+    """Iterates over a dataset while the next samples are read and decoded in the background.
+
+    Up to ``depth`` samples are loaded ahead on a pool of ``num_threads`` threads, and their
+    PIL images are decoded there (PIL releases the GIL while decoding). It can be iterated
+    directly or wrapped in a :class:`~torch.utils.data.DataLoader`, also with ``num_workers=0``.
+    With several workers, each worker prefetches the indices ``i`` with
+    ``i % num_workers == worker_id``.
+
+    The counters of :attr:`stats` live in shared memory with one slot per worker, like those
+    of :class:`~datasets.profiling.StageProfiler`, so they include the samples yielded by the
+    ``DataLoader`` workers.
+
+    Args:
+        dataset (Dataset): Any map-style dataset, e.g. :class:`~datasets.MOCS`.
+        indices (iterable, optional): Order of the samples, e.g. a sampler, which is iterated
+            again every epoch. An iterator or another iterable without a length is read into a
+            list once. Defaults to all samples in order.
+        depth (int, optional): Number of samples loaded ahead.
+        num_threads (int, optional): Number of threads loading the samples.
+        max_workers (int, optional): Number of worker slots of the counters.
+    """
+
+    def __init__(
+            self,
+            dataset: Dataset,
+            indices: Optional[Iterable[int]] = None,
+            depth: int = 8,
+            num_threads: int = 4,
+            max_workers: int = 64
+    ) -> None:
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        if indices is not None and (isinstance(indices, Iterator) or not isinstance(indices, Sized)):
+            # a one-shot iterator would be exhausted after the first epoch
+            indices = list(indices)
+
+        self.dataset = dataset
+        self.indices = indices
+        self.depth = depth
+        self.num_threads = num_threads
+        self.max_workers = max_workers
+        # samples, stalls and ready, and the stall time, of the main process and every worker
+        self.counts = torch.zeros(max_workers + 1, 3, dtype=torch.int64).share_memory_()
+        self.stall_time = torch.zeros(max_workers + 1, dtype=torch.float64).share_memory_()
+
+    @property
+    def stats(self) -> PrefetchStats:
+        """Return the counters of all iterations so far, in this process and in the workers."""
+        samples, stalls, ready = self.counts.sum(dim=0).tolist()
+        return PrefetchStats(samples, stalls, float(self.stall_time.sum()), ready)
+
+    def reset_stats(self) -> None:
+        self.counts.zero_()
+        self.stall_time.zero_()
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        indices = self.indices if self.indices is not None else range(len(self.dataset))
+        worker_info = get_worker_info()
+        slot = 0 if worker_info is None else worker_info.id % self.max_workers + 1
+        if worker_info is not None:
+            # split by index value, so workers iterating differently shuffled orders still cover each sample once
+            indices = (index for index in indices if index % worker_info.num_workers == worker_info.id)
+        indices = iter(indices)
+
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+            try:
+                for index in indices:
+                    pending.append(executor.submit(self._load, index))
+                    if len(pending) == self.depth:
+                        break
+
+                while pending:
+                    future = pending.popleft()
+                    ready = sum(f.done() for f in pending) + future.done()
+                    stalled = not future.done()
+                    if stalled:
+                        tic = time.perf_counter()
+                        sample = future.result()
+                        self.stall_time[slot] += time.perf_counter() - tic
+                    else:
+                        sample = future.result()
+
+                    index = next(indices, None)
+                    if index is not None:
+                        pending.append(executor.submit(self._load, index))
+
+                    self.counts[slot] += torch.tensor([1, stalled, ready])
+                    yield sample
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __len__(self) -> int:
+        return len(self.indices) if self.indices is not None else len(self.dataset)
+
+    def _load(self, index: int) -> Tuple[Any, Any]:
+        sample = self.dataset[index]
+        if isinstance(sample[0], Image.Image):
+            sample[0].load()
+        return sample
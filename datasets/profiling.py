@@ -0,0 +1,152 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import torch
+from torch.utils.data import get_worker_info
+
+STAGES = ("load_annotations", "image", "annotation", "transform")
+
+# upper bounds of the latency buckets, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+class StageProfiler:
+    """Latency histograms of the stages of loading a sample, and the number of bytes read.
+
+    The stages are ``load_annotations`` (once, when the dataset is built), ``image``
+    (opening and decoding an image), ``annotation`` (building a target) and ``transform``.
+
+    The counters live in shared memory with one slot per ``DataLoader`` worker, so the
+    profiler of a dataset in the main process sees the samples loaded by all workers, also
+    while they are running, and no two processes ever write the same counters. The main
+    process uses slot 0, worker ``i`` slot ``i % max_workers + 1``.
+
+    Args:
+        buckets (sequence, optional): Upper bounds of the latency buckets, in seconds.
+        max_workers (int, optional): Number of worker slots.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, max_workers: int = 64) -> None:
+        self.buckets = np.asarray(buckets, dtype=np.float64)
+        self.max_workers = max_workers
+        slots = max_workers + 1
+        self.counts = torch.zeros(slots, len(STAGES), len(self.buckets) + 1, dtype=torch.int64).share_memory_()
+        self.seconds = torch.zeros(slots, len(STAGES), dtype=torch.float64).share_memory_()
+        self.bytes_read = torch.zeros(slots, dtype=torch.int64).share_memory_()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage: str, count: int = 1) -> Iterator[None]:
+        """Time the block as ``count`` samples of ``stage``, e.g. the targets of a batch."""
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - tic, count)
+
+    def observe(self, stage: str, seconds: float, count: int = 1) -> None:
+        """Record ``count`` samples of ``stage`` that took ``seconds`` in total."""
+        if count <= 0:
+            return
+        stage_index = STAGES.index(stage)
+        bucket = int(np.searchsorted(self.buckets, seconds / count))
+        slot = self._slot()
+        with self._lock:
+            self.counts[slot, stage_index, bucket] += count
+            self.seconds[slot, stage_index] += seconds
+
+    def add_bytes(self, num_bytes: int) -> None:
+        slot = self._slot()
+        with self._lock:
+            self.bytes_read[slot] += num_bytes
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts.zero_()
+            self.seconds.zero_()
+            self.bytes_read.zero_()
+
+    def summary(self) -> Dict[str, dict]:
+        """Return the count, mean and 50th, 95th and 99th percentile latency in ms of every stage."""
+        counts = self.counts.sum(dim=0).numpy()
+        seconds = self.seconds.sum(dim=0).numpy()
+        summary = {}
+        for i, stage in enumerate(STAGES):
+            total = int(counts[i].sum())
+            if total == 0:
+                continue
+            summary[stage] = {
+                "count": total,
+                "mean_ms": float(seconds[i]) / total * 1000,
+                **{f"p{q}_ms": self._quantile(counts[i], q / 100) * 1000 for q in (50, 95, 99)},
+            }
+        summary["bytes_read"] = int(self.bytes_read.sum())
+        return summary
+
+    def to_prometheus(self, prefix: str = "construction_dataset", labels: Optional[Dict[str, str]] = None) -> str:
+        """Return the histograms and the bytes read in the Prometheus text exposition format."""
+        return prometheus_text({"": self}, prefix, labels)
+
+    def _quantile(self, counts: np.ndarray, q: float) -> float:
+        # linear interpolation inside the bucket, like Prometheus' histogram_quantile
+        cumulative = np.cumsum(counts)
+        rank = q * cumulative[-1]
+        bucket = int(np.searchsorted(cumulative, rank))
+        if bucket >= len(self.buckets):
+            return float(self.buckets[-1])
+        lower = self.buckets[bucket - 1] if bucket > 0 else 0.0
+        below = cumulative[bucket - 1] if bucket > 0 else 0
+        return float(lower + (self.buckets[bucket] - lower) * (rank - below) / max(counts[bucket], 1))
+
+    def _slot(self) -> int:
+        worker_info = get_worker_info()
+        return 0 if worker_info is None else worker_info.id % self.max_workers + 1
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def prometheus_text(
+        profilers: Dict[str, StageProfiler],
+        prefix: str = "construction_dataset",
+        labels: Optional[Dict[str, str]] = None
+) -> str:
+    """Return the metrics of several profilers, labelled with ``dataset="<key>"``, in the Prometheus text format."""
+    latency, read = f"{prefix}_stage_seconds", f"{prefix}_read_bytes_total"
+    lines = [
+        f"# HELP {latency} Latency of the stages of loading a sample.",
+        f"# TYPE {latency} histogram",
+    ]
+    for name, profiler in profilers.items():
+        base = {**({"dataset": name} if name else {}), **(labels or {})}
+        counts = profiler.counts.sum(dim=0).numpy()
+        seconds = profiler.seconds.sum(dim=0).numpy()
+        bounds = [f"{bound:g}" for bound in profiler.buckets] + ["+Inf"]
+        for i, stage in enumerate(STAGES):
+            stage_labels = {**base, "stage": stage}
+            for bound, count in zip(bounds, np.cumsum(counts[i]).tolist()):
+                lines.append(f"{latency}_bucket{_labels({**stage_labels, 'le': bound})} {count}")
+            lines.append(f"{latency}_sum{_labels(stage_labels)} {float(seconds[i])!r}")
+            lines.append(f"{latency}_count{_labels(stage_labels)} {int(counts[i].sum())}")
+
+    lines += [f"# HELP {read} Bytes of image files read.", f"# TYPE {read} counter"]
+    for name, profiler in profilers.items():
+        base = {**({"dataset": name} if name else {}), **(labels or {})}
+        lines.append(f"{read}{_labels(base)} {int(profiler.bytes_read.sum())}")
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
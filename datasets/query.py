@@ -0,0 +1,130 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from torch.utils.data import ConcatDataset, Dataset, Subset
+
+
+class QueryIndex:
+    """Index of the objects of a dataset to select images by category, object count and box size.
+
+    The index holds an inverted index from every category to the sorted indices of the
+    images containing it, and the image, category, box and box area of every object, so that
+    every query is a few vectorized operations over the objects.
+
+    Args:
+        offsets (np.ndarray): Object range of every image, shape ``(N + 1,)``.
+        category_ids (np.ndarray): Category of every object, indexing ``categories``.
+        categories (list): Category names.
+        boxes (np.ndarray): ``(M, 4)`` ``xyxy`` box of every object.
+    """
+
+    def __init__(
+            self,
+            offsets: np.ndarray,
+            category_ids: np.ndarray,
+            categories: Sequence[str],
+            boxes: np.ndarray
+    ) -> None:
+        self.categories = list(categories)
+        self.category_ids = np.asarray(category_ids, dtype=np.int64)
+        self.object_counts = np.diff(np.asarray(offsets, dtype=np.int64))
+        self.object_images = np.repeat(np.arange(len(self.object_counts)), self.object_counts)
+
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        widths, heights = (self.boxes[:, 2:] - self.boxes[:, :2]).astype(np.float64).T
+        self.areas = widths * heights
+
+        # unique (category, image) pairs, sorted by category and then image
+        num_images = max(1, len(self.object_counts))
+        pairs = np.unique(self.category_ids * num_images + self.object_images)
+        self.category_images = pairs % num_images
+        self.category_offsets = np.searchsorted(pairs // num_images, np.arange(len(self.categories) + 1))
+        self._category_lookup: Dict[str, int] = {name: i for i, name in enumerate(self.categories)}
+
+    def __len__(self) -> int:
+        return len(self.object_counts)
+
+    def images(self, category: str) -> np.ndarray:
+        """Return the sorted indices of the images with at least one object of ``category``."""
+        i = self._category_lookup.get(category)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return self.category_images[self.category_offsets[i]:self.category_offsets[i + 1]]
+
+    def select(
+            self,
+            categories: Optional[Iterable[str]] = None,
+            match_all: bool = False,
+            min_objects: Optional[int] = None,
+            max_objects: Optional[int] = None,
+            min_area: Optional[float] = None,
+            max_area: Optional[float] = None
+    ) -> np.ndarray:
+        """Return the sorted indices of the images matching all the given conditions.
+
+        Args:
+            categories (iterable, optional): Images must contain an object of any of these
+                categories, or of all of them if ``match_all`` is set.
+            match_all (bool, optional): If True, images must contain every category.
+            min_objects (int, optional): Minimum number of objects in the image. Only the
+                objects of ``categories`` are counted if given.
+            max_objects (int, optional): Maximum number of objects, counted the same way.
+            min_area (float, optional): Images must contain an object, of ``categories`` if
+                given, whose box area is at least ``min_area`` (and at most ``max_area``).
+            max_area (float, optional): Maximum box area of that object.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        objects = None
+        if categories is not None:
+            categories = list(dict.fromkeys(categories))
+            hits = np.zeros(len(self), dtype=np.int64)
+            for category in categories:
+                hits[self.images(category)] += 1
+            mask &= hits >= len(categories) if match_all else hits > 0
+            ids = [self._category_lookup[name] for name in categories if name in self._category_lookup]
+            objects = np.isin(self.category_ids, ids)
+
+        if min_objects is not None or max_objects is not None:
+            if objects is None:
+                counts = self.object_counts
+            else:
+                counts = np.bincount(self.object_images[objects], minlength=len(self))
+            if min_objects is not None:
+                mask &= counts >= min_objects
+            if max_objects is not None:
+                mask &= counts <= max_objects
+
+        if min_area is not None or max_area is not None:
+            in_range = np.ones(len(self.areas), dtype=bool) if objects is None else objects.copy()
+            if min_area is not None:
+                in_range &= self.areas >= min_area
+            if max_area is not None:
+                in_range &= self.areas <= max_area
+            mask &= np.bincount(self.object_images[in_range], minlength=len(self)) > 0
+
+        return np.flatnonzero(mask)
+
+
+def select(dataset: Dataset, **kwargs) -> np.ndarray:
+    """Return the indices of the samples of ``dataset`` matching :meth:`QueryIndex.select`.
+
+    ``dataset`` is one of the construction datasets or a ``ConcatDataset`` of them.
+    """
+    if isinstance(dataset, ConcatDataset):
+        starts = [0] + dataset.cumulative_sizes[:-1]
+        return np.concatenate(
+            [np.empty(0, dtype=np.int64)] + [select(d, **kwargs) + start for d, start in zip(dataset.datasets, starts)]
+        )
+    return dataset.query_index().select(**kwargs)
+
+
+def query(dataset: Dataset, **kwargs) -> Subset:
+    """Return the :class:`~torch.utils.data.Subset` of ``dataset`` matching :meth:`QueryIndex.select`."""
+    return Subset(dataset, select(dataset, **kwargs).tolist())
+
+
+def categories(dataset: Dataset) -> List[str]:
+    """Return the sorted categories of ``dataset``, or of all datasets of a ``ConcatDataset``."""
+    if isinstance(dataset, ConcatDataset):
+        return sorted(set().union(*(categories(d) for d in dataset.datasets)))
+    return sorted(dataset.query_index().categories)
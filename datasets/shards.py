@@ -0,0 +1,153 @@
+import io
+import json
+import os
+import pickle
+import random
+import tarfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+from torch.utils.data import IterableDataset, get_worker_info
+
+SHARD_FORMAT = 1
+INDEX_FILE = "index.json"
+
+
+def export_shards(dataset, path: str, shard_size: int = 256 << 20) -> Dict[str, Any]:
+    """Pack a dataset into tar shards of about ``shard_size`` bytes.
+
+    Every sample is stored as two members, ``<key>.<image extension>`` with the original
+    encoded image file and ``<key>.pickle`` with the pickled target. ``index.json`` lists
+    the shards and the byte offset and size of both members of every sample, so the
+    shards can be streamed sequentially by :class:`ShardedDataset` or read randomly by
+    :func:`read_sample`.
+
+    Args:
+        dataset (ConstructionDataset): Dataset to export, e.g. :class:`~datasets.ACID`.
+        path (string): Output directory.
+        shard_size (int, optional): Size in bytes after which a new shard is started.
+
+    Returns:
+        dict: The written index.
+    """
+    os.makedirs(path, exist_ok=True)
+    index = {"format": SHARD_FORMAT, "dataset": dataset.__class__.__name__, "shards": []}
+
+    tar = None
+    for i in range(len(dataset)):
+        if tar is None or tar.offset >= shard_size:
+            if tar is not None:
+                tar.close()
+            shard = {"file": f"shard-{len(index['shards']):05d}.tar", "samples": []}
+            index["shards"].append(shard)
+            tar = tarfile.open(os.path.join(path, shard["file"]), "w", format=tarfile.USTAR_FORMAT)
+
+        image_file = dataset._image_file(i)
+        with open(image_file, "rb") as fp:
+            image = fp.read()
+        target = pickle.dumps(dataset._load_target(i), protocol=pickle.HIGHEST_PROTOCOL)
+
+        extension = os.path.splitext(image_file)[1].lower() or ".img"
+        image_offset = _add_member(tar, f"{i:08d}{extension}", image)
+        target_offset = _add_member(tar, f"{i:08d}.pickle", target)
+        shard["samples"].append([image_offset, len(image), target_offset, len(target)])
+
+    if tar is not None:
+        tar.close()
+
+    with open(os.path.join(path, INDEX_FILE), "w") as fp:
+        json.dump(index, fp)
+    return index
+
+
+def read_sample(path: str, shard: Dict[str, Any], i: int) -> Tuple[Image.Image, Any]:
+    """Read sample ``i`` of a ``shard`` of the index in ``path`` with two reads."""
+    image_offset, image_size, target_offset, target_size = shard["samples"][i]
+    with open(os.path.join(path, shard["file"]), "rb") as fp:
+        fp.seek(image_offset)
+        image = fp.read(image_size)
+        fp.seek(target_offset)
+        target = fp.read(target_size)
+    return Image.open(io.BytesIO(image)), pickle.loads(target)
+
+
+class ShardedDataset(IterableDataset):
+    """Streams the samples of shards written by :func:`export_shards`.
+
+    Every shard is read front to back in one pass. With several ``DataLoader`` workers,
+    each worker reads every ``num_workers``-th shard.
+
+    Args:
+        path (string): Directory with ``index.json`` and the shards.
+        shuffle (bool, optional): If True, the order of the shards is shuffled every epoch.
+        seed (int, optional): Seed of the shuffling, combined with the epoch.
+        transforms (callable, optional): A function/transforms that takes in
+            an image and a label and returns the transformed versions of both.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            shuffle: bool = False,
+            seed: int = 0,
+            transforms: Optional[Callable] = None
+    ) -> None:
+        self.path = path
+        self.shuffle = shuffle
+        self.seed = seed
+        self.transforms = transforms
+        self.epoch = 0
+
+        with open(os.path.join(path, INDEX_FILE)) as fp:
+            self.index = json.load(fp)
+        if self.index.get("format") != SHARD_FORMAT:
+            raise RuntimeError(f"Unsupported shard format in {path}")
+
+    @property
+    def shards(self) -> List[Dict[str, Any]]:
+        return self.index["shards"]
+
+    def set_epoch(self, epoch: int) -> None:
+        """Set the epoch, which changes the shard order when ``shuffle`` is set."""
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        return sum(len(shard["samples"]) for shard in self.shards)
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        shards = list(self.shards)
+        if self.shuffle:
+            random.Random(self.seed + self.epoch).shuffle(shards)
+
+        worker_info = get_worker_info()
+        if worker_info is not None:
+            shards = shards[worker_info.id::worker_info.num_workers]
+
+        for shard in shards:
+            for image, target in self._stream(shard):
+                if self.transforms is not None:
+                    image, target = self.transforms(image, target)
+                yield image, target
+
+    def _stream(self, shard: Dict[str, Any]) -> Iterator[Tuple[Image.Image, Any]]:
+        with open(os.path.join(self.path, shard["file"]), "rb", buffering=1 << 20) as fp:
+            position = 0
+            for image_offset, image_size, target_offset, target_size in shard["samples"]:
+                # members are in file order, seeking only skips the tar headers
+                fp.seek(image_offset - position, os.SEEK_CUR)
+                image = fp.read(image_size)
+                fp.seek(target_offset - image_offset - image_size, os.SEEK_CUR)
+                target = fp.read(target_size)
+                position = target_offset + target_size
+                yield Image.open(io.BytesIO(image)), pickle.loads(target)
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes) -> int:
+    """Append ``data`` as member ``name`` and return the offset of the data in the archive."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    offset = tar.offset + len(info.tobuf(tar.format, tar.encoding, tar.errors))
+    tar.addfile(info, io.BytesIO(data))
+    return offset
@@ -0,0 +1,219 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+from torch.utils.data import ConcatDataset, Dataset
+
+from .cache import AnnotationCache
+from .compact import StringTable
+
+STATS_VERSION = 1
+
+# box areas are counted in power of two bins, [2 ** i, 2 ** (i + 1)) square pixels
+AREA_EDGES = 2.0 ** np.arange(0, 33)
+
+
+class DatasetStatistics:
+    """Aggregate statistics of a dataset.
+
+    Args:
+        categories (list): Category names.
+        class_counts (np.ndarray): Number of objects of every category.
+        image_counts (np.ndarray): Number of images containing every category.
+        objects_per_image (np.ndarray): Number of images with ``i`` objects, at index ``i``.
+        area_counts (np.ndarray): Number of boxes whose area falls in every bin of ``AREA_EDGES``.
+        image_sizes (np.ndarray): ``(width, height)`` of every image, shape ``(N, 2)``.
+        keypoint_names (list, optional): Keypoint names, for keypoint datasets.
+        keypoint_ranges (np.ndarray, optional): ``[[min_x, min_y], [max_x, max_y]]`` of every
+            keypoint, shape ``(K, 2, 2)``.
+    """
+
+    _ARRAYS = ("class_counts", "image_counts", "objects_per_image", "area_counts", "image_sizes", "keypoint_ranges")
+
+    def __init__(
+            self,
+            categories: Sequence[str],
+            class_counts: np.ndarray,
+            image_counts: np.ndarray,
+            objects_per_image: np.ndarray,
+            area_counts: np.ndarray,
+            image_sizes: np.ndarray,
+            keypoint_names: Sequence[str] = (),
+            keypoint_ranges: Optional[np.ndarray] = None
+    ) -> None:
+        self.categories = list(categories)
+        self.class_counts = class_counts
+        self.image_counts = image_counts
+        self.objects_per_image = objects_per_image
+        self.area_counts = area_counts
+        self.image_sizes = image_sizes
+        self.keypoint_names = list(keypoint_names)
+        self.keypoint_ranges = np.zeros((0, 2, 2), dtype=np.float32) if keypoint_ranges is None else keypoint_ranges
+
+    @property
+    def num_images(self) -> int:
+        return len(self.image_sizes)
+
+    @property
+    def num_objects(self) -> int:
+        return int(self.class_counts.sum())
+
+    def resolutions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the distinct ``(width, height)`` of the images and the number of images of each."""
+        return np.unique(self.image_sizes.reshape(-1, 2), axis=0, return_counts=True)
+
+    def summary(self) -> Dict[str, Any]:
+        widths, heights = self.image_sizes.reshape(-1, 2).T
+        summary = {
+            "images": self.num_images,
+            "objects": self.num_objects,
+            "classes": dict(zip(self.categories, self.class_counts.tolist())),
+            "mean_objects_per_image": self.num_objects / max(1, self.num_images),
+            "width": [int(widths.min()), int(widths.max())] if len(widths) else [],
+            "height": [int(heights.min()), int(heights.max())] if len(heights) else [],
+        }
+        if self.keypoint_names:
+            summary["keypoints"] = dict(zip(self.keypoint_names, self.keypoint_ranges.tolist()))
+        return summary
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "DatasetStatistics":
+        return cls(
+            StringTable.from_arrays(arrays, "categories"),
+            *(arrays[name] for name in cls._ARRAYS[:-1]),
+            keypoint_names=StringTable.from_arrays(arrays, "keypoint_names"),
+            keypoint_ranges=arrays["keypoint_ranges"],
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            **StringTable.from_strings(self.categories).to_arrays("categories"),
+            **StringTable.from_strings(self.keypoint_names).to_arrays("keypoint_names"),
+            **{name: getattr(self, name) for name in self._ARRAYS},
+        }
+
+    @classmethod
+    def merge(cls, statistics: Sequence["DatasetStatistics"]) -> "DatasetStatistics":
+        """Combine the statistics of several datasets, e.g. the splits of a dataset."""
+        categories = sorted(set().union(*(s.categories for s in statistics)))
+        lookup = {name: i for i, name in enumerate(categories)}
+        class_counts = np.zeros(len(categories), dtype=np.int64)
+        image_counts = np.zeros(len(categories), dtype=np.int64)
+        objects_per_image = np.zeros(max((len(s.objects_per_image) for s in statistics), default=0), dtype=np.int64)
+        for s in statistics:
+            ids = np.array([lookup[name] for name in s.categories], dtype=np.int64)
+            np.add.at(class_counts, ids, s.class_counts)
+            np.add.at(image_counts, ids, s.image_counts)
+            objects_per_image[:len(s.objects_per_image)] += s.objects_per_image
+
+        keypoint_names = statistics[0].keypoint_names if statistics else []
+        keypoint_ranges = None
+        if keypoint_names and all(s.keypoint_names == keypoint_names for s in statistics):
+            ranges = np.stack([s.keypoint_ranges for s in statistics])
+            keypoint_ranges = np.stack([ranges[:, :, 0].min(axis=0), ranges[:, :, 1].max(axis=0)], axis=1)
+        else:
+            keypoint_names = []
+
+        return cls(
+            categories,
+            class_counts,
+            image_counts,
+            objects_per_image,
+            np.sum([s.area_counts for s in statistics], axis=0),
+            np.concatenate([s.image_sizes.reshape(-1, 2) for s in statistics]),
+            keypoint_names,
+            keypoint_ranges,
+        )
+
+
+def compute_statistics(dataset, num_threads: Optional[int] = None) -> DatasetStatistics:
+    """Compute the statistics of one of the construction datasets.
+
+    The per-object aggregates are computed from the arrays of the dataset's
+    :class:`~datasets.query.QueryIndex`, and the image sizes are read from the image
+    headers on ``num_threads`` threads, without decoding any image.
+    """
+    index = dataset.query_index()
+    num_categories = len(index.categories)
+    class_counts = np.bincount(index.category_ids, minlength=num_categories)
+    image_counts = np.diff(index.category_offsets)
+    objects_per_image = np.bincount(index.object_counts)
+
+    areas = np.clip(index.areas, AREA_EDGES[0], AREA_EDGES[-1])
+    area_counts, _ = np.histogram(areas, bins=AREA_EDGES)
+
+    image_sizes = read_image_sizes([dataset._image_file(i) for i in range(len(dataset))], num_threads)
+
+    keypoint_names, keypoint_ranges = (), None
+    keypoints = dataset._keypoint_arrays()
+    if keypoints is not None:
+        keypoint_names, points = keypoints
+        keypoint_ranges = np.stack([np.nanmin(points, axis=0), np.nanmax(points, axis=0)], axis=1)
+
+    return DatasetStatistics(
+        index.categories,
+        class_counts.astype(np.int64),
+        image_counts.astype(np.int64),
+        objects_per_image.astype(np.int64),
+        area_counts.astype(np.int64),
+        image_sizes,
+        keypoint_names,
+        keypoint_ranges,
+    )
+
+
+def read_image_sizes(files: Sequence[str], num_threads: Optional[int] = None) -> np.ndarray:
+    """Return the ``(width, height)`` of every image file, read from the headers on a thread pool."""
+    num_threads = num_threads or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        sizes = list(executor.map(_image_size, files, chunksize=64))
+    return np.array(sizes, dtype=np.int32).reshape(-1, 2)
+
+
+def load_statistics(
+        dataset,
+        cache: bool = True,
+        cache_dir: Optional[str] = None,
+        num_threads: Optional[int] = None
+) -> DatasetStatistics:
+    """Return the statistics of a dataset, from ``<cache_dir>/<name>.stats`` if ``cache`` is set.
+
+    The cache is invalidated when any annotation file or image changes. Only the
+    annotation files are hashed, the images are checked by size and mtime. ``cache_dir``
+    defaults to the ``labels_dir`` of the dataset. A dataset loaded from a
+    :class:`~datasets.bundle.Bundle` uses the statistics compiled into it, and nothing is
+    written next to its sources.
+    """
+    bundle = getattr(dataset, "bundle", None)
+    if bundle is not None:
+        arrays = bundle.statistics(STATS_VERSION)
+        return compute_statistics(dataset, num_threads) if arrays is None else DatasetStatistics.from_arrays(arrays)
+    if not cache:
+        return compute_statistics(dataset, num_threads)
+
+    images = [dataset._image_file(i) for i in range(len(dataset))]
+    annotations = dataset._annotation_sources()
+    # the annotation files tell the splits of a dataset apart
+    key = hashlib.sha1("\n".join(os.path.abspath(file) for file in annotations).encode()).hexdigest()[:12]
+    path = os.path.join(cache_dir or dataset.labels_dir, f"{dataset.__class__.__name__.lower()}-{key}.stats")
+
+    stats_cache = AnnotationCache(path, annotations, STATS_VERSION, stat_sources=images)
+    arrays = stats_cache.load()
+    if arrays is None:
+        arrays = stats_cache.save(compute_statistics(dataset, num_threads).to_arrays())
+    return DatasetStatistics.from_arrays(arrays)
+
+
+def statistics(dataset: Dataset, **kwargs) -> DatasetStatistics:
+    """Return :func:`load_statistics` of ``dataset``, merged over the datasets of a ``ConcatDataset``."""
+    if isinstance(dataset, ConcatDataset):
+        return DatasetStatistics.merge([statistics(d, **kwargs) for d in dataset.datasets])
+    return load_statistics(dataset, **kwargs)
+
+
+def _image_size(file: str) -> List[int]:
+    with Image.open(file) as image:
+        return list(image.size)
@@ -0,0 +1,138 @@
+"""Joint image and target transforms.
+
+The transforms work on the array targets returned with ``return_arrays=True``: every
+coordinate is transformed with numpy operations on whole arrays. A target can hold
+
+- ``"boxes"``: ``(N, 4)`` boxes in ``xyxy`` format,
+- ``"keypoints"``: ``(K, 2)`` points,
+- ``"polygons"``: ``(V, 2)`` vertices of all polygons,
+
+and any other entries, which are passed through unchanged.
+"""
+import random
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+POINT_KEYS = ("keypoints", "polygons")
+
+
+def map_points(target: Dict[str, Any], fn: Callable[[np.ndarray], np.ndarray]) -> Dict[str, Any]:
+    """Return a copy of ``target`` with ``fn`` applied to all its points.
+
+    ``fn`` maps a ``(n, 2)`` float32 array of points to the transformed points. Boxes are
+    transformed through their two corners and normalized to ``xyxy`` again.
+    """
+    target = dict(target)
+    for key in POINT_KEYS:
+        if key in target:
+            points = np.asarray(target[key], dtype=np.float32)
+            target[key] = fn(points.reshape(-1, 2)).reshape(points.shape)
+    if "boxes" in target:
+        corners = fn(np.asarray(target["boxes"], dtype=np.float32).reshape(-1, 2)).reshape(-1, 2, 2)
+        target["boxes"] = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+    return target
+
+
+def scale(target: Dict[str, Any], sx: float, sy: float) -> Dict[str, Any]:
+    """Scale all x coordinates of ``target`` by ``sx`` and all y coordinates by ``sy``."""
+    factor = np.array([sx, sy], dtype=np.float32)
+    return map_points(target, lambda points: points * factor)
+
+
+class Compose:
+    """Composes several joint transforms.
+
+    Args:
+        transforms (list): Transforms taking and returning an ``(image, target)`` pair.
+    """
+
+    def __init__(self, transforms: Sequence[Callable]) -> None:
+        self.transforms = list(transforms)
+
+    def __call__(self, image: Image.Image, target: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        for transform in self.transforms:
+            image, target = transform(image, target)
+        return image, target
+
+
+class ImageOnly:
+    """Applies an image transform, e.g. ``torchvision.transforms.ToTensor()``, and keeps the target.
+
+    Args:
+        transform (callable): Transform taking and returning an image.
+    """
+
+    def __init__(self, transform: Callable) -> None:
+        self.transform = transform
+
+    def __call__(self, image: Any, target: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        return self.transform(image), target
+
+
+class Resize:
+    """Resizes the image to ``size`` and scales the target to match.
+
+    Args:
+        size (tuple): Output ``(width, height)``.
+    """
+
+    def __init__(self, size: Tuple[int, int]) -> None:
+        self.size = tuple(size)
+
+    def __call__(self, image: Image.Image, target: Dict[str, Any]) -> Tuple[Image.Image, Dict[str, Any]]:
+        width, height = image.size
+        image = image.resize(self.size, Image.BILINEAR)
+        return image, scale(target, self.size[0] / width, self.size[1] / height)
+
+
+class RandomHorizontalFlip:
+    """Flips the image and the target horizontally with probability ``p``.
+
+    Args:
+        p (float, optional): Probability of the flip.
+    """
+
+    def __init__(self, p: float = 0.5) -> None:
+        self.p = p
+
+    def __call__(self, image: Image.Image, target: Dict[str, Any]) -> Tuple[Image.Image, Dict[str, Any]]:
+        if random.random() >= self.p:
+            return image, target
+
+        width = image.size[0]
+        factor = np.array([-1, 1], dtype=np.float32)
+        offset = np.array([width, 0], dtype=np.float32)
+        return image.transpose(Image.FLIP_LEFT_RIGHT), map_points(target, lambda points: points * factor + offset)
+
+
+class RandomCrop:
+    """Crops a random ``size`` region of the image and moves the target with it.
+
+    Boxes are clipped to the crop. Keypoints and polygons are moved but not clipped, so
+    they can lie outside of the image.
+
+    Args:
+        size (tuple): Crop ``(width, height)``, at most the image size.
+    """
+
+    def __init__(self, size: Tuple[int, int]) -> None:
+        self.size = tuple(size)
+
+    def __call__(self, image: Image.Image, target: Dict[str, Any]) -> Tuple[Image.Image, Dict[str, Any]]:
+        width, height = image.size
+        crop_width, crop_height = self.size
+        if crop_width > width or crop_height > height:
+            raise ValueError(f"Crop size {self.size} is larger than the image size {image.size}")
+
+        left = random.randint(0, width - crop_width)
+        top = random.randint(0, height - crop_height)
+        image = image.crop((left, top, left + crop_width, top + crop_height))
+
+        offset = np.array([left, top], dtype=np.float32)
+        target = map_points(target, lambda points: points - offset)
+        if "boxes" in target:
+            bounds = np.array([crop_width, crop_height, crop_width, crop_height], dtype=np.float32)
+            target["boxes"] = np.clip(target["boxes"], 0, bounds)
+        return image, target
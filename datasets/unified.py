@@ -0,0 +1,197 @@
+import math
+import os
+import random
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+from . import transforms as T
+from .base import ConstructionDataset
+from .compact import ObjectTable, _offsets
+
+
+class UnifiedDataset(ConstructionDataset):
+    """Several detection datasets behind one target schema and one class vocabulary.
+
+    The labels of every source are mapped once, at construction, from the arrays of its
+    :class:`~datasets.query.QueryIndex`. Every sample's target is then
+    ``{"boxes": (N, 4) float32 xyxy array, "labels": (N,) int64 array}``, with labels
+    indexing ``classes``, whatever the format of the source.
+
+    Args:
+        sources (dict): Maps a source name to a dataset, e.g.
+            ``{"acid": ACID(root), "mocs": MOCS(root, "train")}``.
+        class_map (dict, optional): Maps a source name to a dict from the source's category
+            names to unified class names. The objects of a category missing from the dict,
+            or mapped to ``None``, are dropped. Sources without a dict keep their category
+            names, e.g. the phrases of :class:`~datasets.Bang2020` need a dict.
+        classes (sequence, optional): The unified class names, in label order. Objects of
+            other classes are dropped. Defaults to all mapped class names, sorted.
+        transforms (callable, optional): A function/transforms that takes in
+            an image and a label and returns the transformed versions of both.
+        transform (callable, optional): A function/transform that takes in an PIL image
+            and returns a transformed version. E.g, ``transforms.RandomCrop``
+        target_transform (callable, optional): A function/transform that takes in the
+            target and transforms it.
+        max_side (int, optional): If set, images are scaled down so that their longer side is at
+            most ``max_side`` and the target is scaled to match.
+    """
+
+    def __init__(
+            self,
+            sources: Dict[str, ConstructionDataset],
+            class_map: Optional[Dict[str, Dict[str, Optional[str]]]] = None,
+            classes: Optional[Sequence[str]] = None,
+            transforms: Optional[Callable] = None,
+            transform: Optional[Callable] = None,
+            target_transform: Optional[Callable] = None,
+            max_side: Optional[int] = None
+    ) -> None:
+        roots = [os.path.abspath(dataset.root) for dataset in sources.values()]
+        super(UnifiedDataset, self).__init__(os.path.commonpath(roots) if roots else None, transforms=transforms,
+                                             transform=transform, target_transform=target_transform)
+        self.max_side = max_side
+        self.sources = list(sources.values())
+        self.source_names = list(sources)
+        class_map = class_map or {}
+
+        indexes = [dataset.query_index() for dataset in self.sources]
+        mapped = [
+            [_map_class(category, class_map.get(name)) for category in index.categories]
+            for name, index in zip(self.source_names, indexes)
+        ]
+        if classes is None:
+            classes = sorted({name for names in mapped for name in names if name is not None})
+        self.classes = list(classes)
+        lookup = {name: i for i, name in enumerate(self.classes)}
+
+        lengths, boxes, labels = [], [], []
+        for index, names in zip(indexes, mapped):
+            # source category id -> unified label, -1 drops the object
+            labels_of = np.array([lookup.get(name, -1) if name is not None else -1 for name in names], dtype=np.int64)
+            object_labels = labels_of[index.category_ids] if len(labels_of) else np.empty(0, dtype=np.int64)
+            keep = object_labels >= 0
+            lengths.append(np.bincount(index.object_images[keep], minlength=len(index)))
+            boxes.append(index.boxes[keep])
+            labels.append(object_labels[keep])
+
+        self.source_sizes = [len(dataset) for dataset in self.sources]
+        self.source_offsets = _offsets(self.source_sizes)
+        self.objects = ObjectTable.from_lengths(np.concatenate(lengths) if lengths else [], {
+            "boxes": np.concatenate(boxes).astype(np.float32) if boxes else np.empty((0, 4), dtype=np.float32),
+            "labels": np.concatenate(labels) if labels else np.empty(0, dtype=np.int64),
+        })
+
+    def __len__(self) -> int:
+        return int(self.source_offsets[-1])
+
+    def locate(self, index: int) -> Tuple[int, int]:
+        """Return the source and the index in the source of sample ``index``."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        source = int(np.searchsorted(self.source_offsets, index, side="right")) - 1
+        return source, index - int(self.source_offsets[source])
+
+    def _image_file(self, index: int) -> str:
+        source, i = self.locate(index)
+        return self.sources[source]._image_file(i)
+
+    def _load_target(self, index: int) -> Dict[str, Any]:
+        objects = self.objects[index]
+        return {"boxes": objects["boxes"], "labels": objects["labels"]}
+
+    def _load_targets(self, indices: List[int]) -> List[Dict[str, Any]]:
+        lengths, objects = self.objects.gather(indices)
+        ends = np.cumsum(lengths)[:-1]
+        return [
+            {"boxes": boxes, "labels": labels}
+            for boxes, labels in zip(np.split(objects["boxes"], ends), np.split(objects["labels"], ends))
+        ]
+
+    def _scale_target(self, target: Dict[str, Any], sx: float, sy: float) -> Dict[str, Any]:
+        return T.scale(target, sx, sy)
+
+    def _query_arrays(self):
+        return self.objects.offsets, self.objects.columns["labels"], self.classes, self.objects.columns["boxes"]
+
+
+def _map_class(category: str, mapping: Optional[Dict[str, Optional[str]]]) -> Optional[str]:
+    if mapping is None:
+        return category
+    return mapping.get(category)
+
+
+class WeightedInterleavedSampler(Sampler[int]):
+    """Samples the sources of a concatenated dataset in proportion to ``weights``.
+
+    Every draw first picks a source with probability proportional to its weight and then
+    the next sample of that source in a random order. The order of a source is a random
+    affine permutation ``(offset + k * stride) % size``, so every sample of a source is
+    drawn once before any is repeated, and no index list is ever materialized.
+
+    Args:
+        sizes (sequence): Number of samples of every source, in concatenation order, e.g.
+            ``UnifiedDataset.source_sizes``.
+        weights (sequence): Sampling weight of every source.
+        num_samples (int, optional): Number of samples per epoch, defaults to the total size.
+        seed (int, optional): Seed, combined with the epoch set by :meth:`set_epoch`.
+        chunk_size (int, optional): Number of source draws made at once.
+    """
+
+    def __init__(
+            self,
+            sizes: Sequence[int],
+            weights: Sequence[float],
+            num_samples: Optional[int] = None,
+            seed: int = 0,
+            chunk_size: int = 4096
+    ) -> None:
+        if len(sizes) != len(weights):
+            raise ValueError("sizes and weights must have the same length")
+        weights = torch.as_tensor(weights, dtype=torch.double) * torch.as_tensor([size > 0 for size in sizes])
+        if not (weights >= 0).all() or weights.sum() <= 0:
+            raise ValueError("weights must be non-negative and select at least one non-empty source")
+
+        self.sizes = [int(size) for size in sizes]
+        self.offsets = _offsets(self.sizes).tolist()
+        self.weights = weights
+        self.num_samples = sum(self.sizes) if num_samples is None else num_samples
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def __iter__(self) -> Iterator[int]:
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        rng = random.Random(self.seed + self.epoch)
+        permutations = [_affine_permutation(size, rng) for size in self.sizes]
+        drawn = [0] * len(self.sizes)
+
+        remaining = self.num_samples
+        while remaining > 0:
+            count = min(self.chunk_size, remaining)
+            sources = torch.multinomial(self.weights, count, replacement=True, generator=generator).tolist()
+            for source in sources:
+                offset, stride = permutations[source]
+                yield self.offsets[source] + (offset + drawn[source] * stride) % self.sizes[source]
+                drawn[source] += 1
+            remaining -= count
+
+
+def _affine_permutation(size: int, rng: random.Random) -> Tuple[int, int]:
+    if size <= 1:
+        return 0, 1
+    stride = rng.randrange(1, size)
+    while math.gcd(stride, size) != 1:
+        stride = rng.randrange(1, size)
+    return rng.randrange(size), stride
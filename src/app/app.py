@@ -38,6 +38,19 @@ def create_layout() -> html.Div:
                     {"label": "An et al. (2021) - Moving Objects in the Construction Site (MOCS)", "value": "MOCS"},
                 ],
             ),
+            html.Small(id="dataset-info", className="text-muted"),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        dcc.Dropdown(id="filter-categories", multi=True, placeholder="Filter by category"),
+                    ),
+                    dbc.Col(
+                        dbc.Input(id="filter-min-objects", type="number", min=0, placeholder="Minimum objects"),
+                        width=2,
+                    ),
+                ],
+                class_name="mt-2",
+            ),
         ]
     )
 
@@ -66,6 +79,13 @@ def create_layout() -> html.Div:
         ]
     )
 
+    statistics = dbc.Accordion(
+        dbc.AccordionItem(dcc.Graph(id="stats-graph", style={"height": "40vh"}), title="Statistics", item_id="stats"),
+        id="stats-accordion",
+        start_collapsed=True,
+        class_name="mt-4",
+    )
+
     return html.Div(
         [
             nav_bar,
@@ -73,6 +93,7 @@ def create_layout() -> html.Div:
                 [
                     select_dataset,
                     graph,
+                    statistics,
                 ],
                 class_name="mb-5",
             ),
@@ -80,10 +101,11 @@ def create_layout() -> html.Div:
     )
 
 
-def create_app() -> Dash:
+def create_app(**kwargs) -> Dash:
+    """Create the visualiser, ``kwargs`` are passed on to :func:`create_callbacks`."""
     app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.FONT_AWESOME])
     app.layout = create_layout()
-    create_callbacks(app)
+    create_callbacks(app, **kwargs)
     return app
 
 
@@ -1,25 +1,72 @@
+from functools import partial
+from typing import Dict, Iterable, Optional
+
 import dash
-import numpy as np
 import plotly.graph_objects as go
 from dash import Output, Input
-from torch.utils import data
 from torchvision.datasets import VisionDataset
 
-from datasets import Luo2020, Bang2020, ACID, MOCS
+from datasets.query import categories, select
+from datasets.stats import DatasetStatistics, statistics
+from figure_cache import FigureCache
+from registry import DatasetRegistry
+from renderers import Renderer, default_renderers
+from stats_view import create_stats_figure
+from thumbnails import Thumbnailer
+
+
+def create_registry(renderers: Iterable[Renderer], root: str = "data/") -> DatasetRegistry:
+    return DatasetRegistry({renderer.name: partial(renderer.create_dataset, root) for renderer in renderers})
+
+
+def create_callbacks(
+    app: dash.Dash,
+    renderers: Optional[Iterable[Renderer]] = None,
+    datasets: Optional[DatasetRegistry] = None,
+    figures: Optional[FigureCache] = None,
+    thumbnails: Optional[Thumbnailer] = None,
+    preload: bool = True,
+) -> None:
+    renderers: Dict[str, Renderer] = {renderer.name: renderer for renderer in renderers or default_renderers()}
+    if datasets is None:
+        datasets = create_registry(renderers.values())
+    if preload:
+        datasets.preload()
+    if thumbnails is None:
+        thumbnails = Thumbnailer()
+    if figures is None:
+        figures = FigureCache(lambda name, idx: renderers[name].render(datasets.get(name), idx, thumbnails))
 
+    @app.callback(
+        [Output("filter-categories", "options"), Output("filter-categories", "value")],
+        Input("select", "value"),
+    )
+    def update_filters(dataset_name: str):
+        if dataset_name not in renderers or dataset_name not in datasets:
+            return [], []
+        try:
+            options = categories(datasets.get(dataset_name))
+        except Exception:
+            options = []  # reported by update_graph
+        return options, []
 
-def create_callbacks(app: dash.Dash) -> None:
-    datasets = {
-        "luo2020": Luo2020("data/"),
-        "bang2020": Bang2020("data/"),
-        "ACID": ACID("data/"),
-        "MOCS": data.ConcatDataset(
-            [
-                MOCS("data/", "train"),
-                MOCS("data/", "val"),
-            ]
-        ),
-    }
+    dataset_statistics: Dict[str, DatasetStatistics] = {}
+
+    @app.callback(
+        Output("stats-graph", "figure"),
+        [Input("select", "value"), Input("stats-accordion", "active_item")],
+    )
+    def update_stats(dataset_name: str, active_item):
+        # only computed once the statistics are opened, the first time reads every image header
+        if active_item != "stats" or dataset_name not in renderers or dataset_name not in datasets:
+            return go.Figure()
+        if dataset_name not in dataset_statistics:
+            try:
+                dataset = datasets.get(dataset_name)
+            except Exception:
+                return go.Figure()  # reported by update_graph
+            dataset_statistics[dataset_name] = statistics(dataset)
+        return create_stats_figure(dataset_statistics[dataset_name])
 
     @app.callback(
         [
@@ -28,141 +75,51 @@ def create_callbacks(app: dash.Dash) -> None:
             Output("slider-page", "max"),
             Output("input-page", "value"),
             Output("input-page", "max"),
+            Output("dataset-info", "children"),
+        ],
+        [
+            Input("select", "value"),
+            Input("slider-page", "value"),
+            Input("input-page", "value"),
+            Input("filter-categories", "value"),
+            Input("filter-min-objects", "value"),
         ],
-        [Input("select", "value"), Input("slider-page", "value"), Input("input-page", "value")],
     )
-    def update_graph(dataset_name: str, slider_value, input_value):
-        # TODO: move all this to classes
-
-        fig = go.Figure()
-        fig.update_layout(
-            margin=dict(l=20, r=20, t=20, b=20),
-        )
+    def update_graph(dataset_name: str, slider_value, input_value, filter_categories, filter_min_objects):
         if dash.ctx.triggered_id == "slider-page":
             page = slider_value
         elif dash.ctx.triggered_id == "input-page":
             page = input_value
         else:
-            page = 1  # dataset changed, reset to first page
+            page = 1  # dataset or filter changed, reset to first page
 
-        if dataset_name not in datasets.keys():
+        if dataset_name not in renderers or dataset_name not in datasets:
             page = 0
             max_value = 0
-            return fig, page, max_value, page, max_value
-        else:
-            dataset: VisionDataset = datasets[dataset_name]
-            max_value = len(dataset)
-            idx = page - 1
-            img, target = dataset[idx]
-
-            fig.update_xaxes(
-                range=[0, img.width],
-                showgrid=False,
-            )
-            fig.update_yaxes(range=[0, img.height], scaleanchor="x", scaleratio=1, showgrid=False, autorange="reversed")
-
-            fig.add_layout_image(
-                source=img,
-                xref="x",
-                yref="y",
-                x=0,
-                y=0,
-                sizex=img.width,
-                sizey=img.height,
-                sizing="stretch",
-                opacity=1.0,
-                layer="below",
-                xanchor="left",
-                yanchor="top",
-            )
-
-        if dataset_name == "luo2020":
-            key_points = [
-                "body_end",
-                "cab_boom",
-                "boom_arm",
-                "arm_bucket",
-                "bucket_end_left",
-                "bucket_end_right",
-                "arm_bucket",
-            ]
-
-            x = [target[key + "_x"] for key in key_points]
-            y = [target[key + "_y"] for key in key_points]
-
-            fig.add_trace(go.Scatter(x=x, y=y, text=key_points))
-
-        elif dataset_name == "bang2020":
-            for regions in target:
-                x, y, w, h = regions["x"], regions["y"], regions["width"], regions["height"]
-                fig.add_trace(
-                    go.Scatter(
-                        x=[x, x, x + w, x + w, x],
-                        y=[y + h, y, y, y + h, y + h],
-                        name=regions["phrase"],
-                        fill="toself",
-                        fillcolor="rgba(0,0,0,0)",
-                        mode="lines",
-                    )
-                )
-
-        elif dataset_name == "ACID":
-            for obj in target:
-                xmin, ymin, xmax, ymax = obj["bbox"]
-                x = [xmin, xmin, xmax, xmax, xmin]
-                y = [ymin, ymax, ymax, ymin, ymin]
-                fig.add_trace(
-                    go.Scatter(
-                        x=x,
-                        y=y,
-                        name=obj["name"],
-                        fill="toself",
-                        fillcolor="rgba(0,0,0,0)",
-                        mode="lines",
-                        text=f"""<b>pose:</b> {obj["pose"]}<br>"""
-                        + f"""<b>truncated:</b> {obj["truncated"]}"""
-                        + f"""<br><b>difficult:</b> {obj["difficult"]}""",
-                    )
-                )
-
-        elif dataset_name == "MOCS":
-            import plotly.express as px
-
-            colors = px.colors.qualitative.Plotly
-            i = 0
-
-            for obj in target:
-                x, y, w, h = obj["bbox"]
-                color = colors[i % len(colors)]
-
-                fig.add_trace(
-                    go.Scatter(
-                        x=[x, x, x + w, x + w, x],
-                        y=[y + h, y, y, y + h, y + h],
-                        name=obj["category"],
-                        mode="lines",
-                        showlegend=False,
-                        line=dict(color=color),
-                    )
-                )
-
-                segmentation: np.ndarray = obj["segmentation"]
-                show_legend = True
-                for seg in segmentation:
-                    fig.add_trace(
-                        go.Scatter(
-                            x=seg[:, 0],
-                            y=seg[:, 1],
-                            name=obj["category"],
-                            fill="toself",
-                            mode="lines",
-                            showlegend=show_legend,
-                            line=dict(color=color),
-                        )
-                    )
-
-                    show_legend = False
-
-                i = i + 1
-
-        return fig, page, max_value, page, max_value
+            return go.Figure(), page, max_value, page, max_value, ""
+
+        try:
+            dataset: VisionDataset = datasets.get(dataset_name)
+        except Exception as e:
+            return go.Figure(), 0, 0, 0, 0, f"Failed to load {dataset_name}: {e}"
+
+        indices = None
+        if filter_categories or filter_min_objects:
+            indices = select(dataset, categories=filter_categories or None, min_objects=filter_min_objects or None)
+            if len(indices) == 0:
+                return go.Figure(), 0, 0, 0, 0, "No images match the filter"
+        max_value = len(dataset) if indices is None else len(indices)
+        page = min(max(page or 1, 1), max_value)
+        idx = page - 1 if indices is None else int(indices[page - 1])
+
+        fig = figures.get(dataset_name, idx)
+        figures.prefetch(dataset_name, page - 1, indices, max_value)
+
+        info = (
+            f"Loaded in {datasets.load_times[dataset_name] * 1000:.0f}ms, "
+            f"rendered in {renderers[dataset_name].mean_render_time * 1000:.0f}ms on average"
+        )
+        if indices is not None:
+            info = f"{max_value} of {len(dataset)} images match. " + info
+
+        return fig, page, max_value, page, max_value, info
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import plotly.io as pio
+
+Key = Tuple[str, int]
+
+
+class FigureCache:
+    """LRU cache of rendered figures keyed by ``(dataset name, index)``.
+
+    Figures are kept as plotly json dicts, which hold the already encoded image. The cache
+    is bounded by the serialized size of the figures: the least recently used figures are
+    evicted once ``max_bytes`` is exceeded. :meth:`prefetch` renders the pages around the
+    current one on background threads, so that moving to the next or previous page is a
+    cache hit.
+
+    Args:
+        render (callable): Function of ``(dataset name, index)`` returning a ``go.Figure``.
+        max_bytes (int, optional): Maximum total size of the cached figures.
+        radius (int, optional): Number of pages before and after the current one to prefetch.
+        num_threads (int, optional): Number of background rendering threads.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[str, int], Any],
+        max_bytes: int = 256 << 20,
+        radius: int = 3,
+        num_threads: int = 2,
+    ) -> None:
+        self.render = render
+        self.max_bytes = max_bytes
+        self.radius = radius
+        self.num_threads = num_threads
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._figures: "OrderedDict[Key, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._pending: Dict[Key, Future] = {}
+        self._latest: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._figures
+
+    def __len__(self) -> int:
+        return len(self._figures)
+
+    def get(self, name: str, index: int) -> Dict[str, Any]:
+        """Return the figure of sample ``index``, rendering it in the calling thread on a miss."""
+        key = (name, index)
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key][0]
+            self.misses += 1
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+
+        if owner:
+            self._render(key, future)
+        return future.result()
+
+    def prefetch(self, name: str, position: int, indices: Optional[Sequence[int]] = None, length: int = 0) -> None:
+        """Render the pages within ``radius`` of ``position`` in the background, nearest first.
+
+        Page ``p`` shows sample ``indices[p]``, or sample ``p`` of a dataset of ``length``
+        samples if ``indices`` is not given.
+        """
+        if indices is None:
+            indices = range(length)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="figure-prefetch")
+
+        with self._lock:
+            self._latest[name] = position
+        for distance in range(1, self.radius + 1):
+            for neighbour in (position + distance, position - distance):
+                if 0 <= neighbour < len(indices):
+                    key = (name, int(indices[neighbour]))
+                    if key not in self._figures and key not in self._pending:
+                        self._executor.submit(self._prefetch, key, neighbour)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._figures.clear()
+            self.size = 0
+
+    def _prefetch(self, key: Key, position: int) -> None:
+        name, _ = key
+        with self._lock:
+            # skip pages the user has already scrolled away from
+            if abs(self._latest.get(name, position) - position) > self.radius:
+                return
+            if key in self._figures or key in self._pending:
+                return
+            future = self._pending[key] = Future()
+        try:
+            self._render(key, future)
+        except Exception:
+            pass  # raised again by the get() of the page
+
+    def _render(self, key: Key, future: Future) -> None:
+        try:
+            figure = self.render(*key).to_plotly_json()
+            size = len(pio.to_json(figure, validate=False))
+        except Exception as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            if size <= self.max_bytes:
+                self._figures[key] = figure, size
+                self.size += size
+                while self.size > self.max_bytes:
+                    _, (_, evicted) = self._figures.popitem(last=False)
+                    self.size -= evicted
+        future.set_result(figure)
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from torch.utils.data import Dataset
+
+
+class DatasetRegistry:
+    """Builds the datasets of the visualiser on first use, or in the background.
+
+    Every dataset is built exactly once, by the first :meth:`get` or by :meth:`preload`;
+    concurrent callers wait for the same build. The build time of every dataset is kept
+    in ``load_times``.
+
+    Args:
+        factories (dict): Maps the name of a dataset to a function building it.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Callable[[], Dataset]]] = None) -> None:
+        self.factories: Dict[str, Callable[[], Dataset]] = dict(factories or {})
+        self.load_times: Dict[str, float] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(self, name: str, factory: Callable[[], Dataset]) -> None:
+        self.factories[name] = factory
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.factories
+
+    def names(self) -> Iterable[str]:
+        return self.factories.keys()
+
+    def get(self, name: str) -> Dataset:
+        """Return the dataset, building it in the calling thread if nobody has started yet."""
+        with self._lock:
+            future = self._futures.get(name)
+            owner = future is None
+            if owner:
+                future = self._futures[name] = Future()
+
+        if owner:
+            self._build(name, future)
+        return future.result()
+
+    def is_loaded(self, name: str) -> bool:
+        future = self._futures.get(name)
+        return future is not None and future.done()
+
+    def preload(self, names: Optional[Iterable[str]] = None, max_workers: Optional[int] = None) -> None:
+        """Start building ``names`` (default: all datasets) in parallel background threads."""
+        names = list(names if names is not None else self.factories)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers or len(names) or 1,
+                                                thread_name_prefix="dataset-loader")
+        for name in names:
+            self._executor.submit(self._get_quietly, name)
+
+    def _get_quietly(self, name: str) -> None:
+        # failures are raised again by the get() of the callback that needs the dataset
+        try:
+            self.get(name)
+        except Exception:
+            pass
+
+    def _build(self, name: str, future: Future) -> None:
+        tic = time.time()
+        try:
+            dataset = self.factories[name]()
+        except Exception as e:
+            future.set_exception(e)
+            print(f"{name} failed to load: {e}")
+            return
+        toc = time.time()
+        self.load_times[name] = toc - tic
+        print(f"{name} loaded in {(toc - tic) * 10000 // 10}ms")
+        future.set_result(dataset)
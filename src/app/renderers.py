@@ -0,0 +1,201 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from torch.utils import data
+
+from datasets import Luo2020, Bang2020, ACID, MOCS
+from thumbnails import Thumbnailer
+from traces import BOX_POINTS, batched_trace, boxes_path, group_by, polygons_path
+
+
+class Renderer:
+    """Base class of the figures of a dataset in the visualiser.
+
+    A renderer builds its dataset with array targets (``return_arrays=True``) and draws the
+    overlays of a target with :meth:`add_traces` straight from those arrays. Subclasses set
+    ``name``, the value of the dataset in the selector, and implement :meth:`create_dataset`
+    and :meth:`add_traces`. The time spent in :meth:`render` is kept in ``render_count``
+    and ``render_time``.
+
+    Args:
+        webgl (bool, optional): If True, the overlays are drawn with ``Scattergl`` traces.
+        cache (bool, optional): Passed on as the ``cache`` argument of the dataset, so that the
+            annotations are kept as memory-mapped arrays. By default the dataset's default is used.
+    """
+
+    name: str
+
+    def __init__(self, webgl: bool = False, cache: Optional[bool] = None) -> None:
+        self.webgl = webgl
+        self.cache = cache
+        self.render_count = 0
+        self.render_time = 0.0
+        self._lock = threading.Lock()
+
+    def create_dataset(self, root: str) -> data.Dataset:
+        raise NotImplementedError
+
+    def _dataset_options(self) -> Dict[str, Any]:
+        return {} if self.cache is None else {"cache": self.cache}
+
+    def add_traces(self, fig: go.Figure, target: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def render(self, dataset: data.Dataset, idx: int, thumbnails: Optional[Thumbnailer] = None) -> go.Figure:
+        tic = time.time()
+        img, target = dataset[idx]
+        # read before building the thumbnail, the layout image is stretched to the original size
+        width, height = img.size
+
+        fig = go.Figure()
+        fig.update_layout(
+            margin=dict(l=20, r=20, t=20, b=20),
+        )
+        fig.update_xaxes(
+            range=[0, width],
+            showgrid=False,
+        )
+        fig.update_yaxes(range=[0, height], scaleanchor="x", scaleratio=1, showgrid=False, autorange="reversed")
+
+        fig.add_layout_image(
+            source=img if thumbnails is None else thumbnails.source(img),
+            xref="x",
+            yref="y",
+            x=0,
+            y=0,
+            sizex=width,
+            sizey=height,
+            sizing="stretch",
+            opacity=1.0,
+            layer="below",
+            xanchor="left",
+            yanchor="top",
+        )
+        self.add_traces(fig, target)
+
+        with self._lock:
+            self.render_count += 1
+            self.render_time += time.time() - tic
+        return fig
+
+    @property
+    def mean_render_time(self) -> float:
+        return self.render_time / self.render_count if self.render_count else 0.0
+
+
+class Luo2020Renderer(Renderer):
+    name = "luo2020"
+
+    # the arm_bucket joint is visited twice to draw the bucket as a closed outline
+    skeleton = [
+        "body_end",
+        "cab_boom",
+        "boom_arm",
+        "arm_bucket",
+        "bucket_end_left",
+        "bucket_end_right",
+        "arm_bucket",
+    ]
+
+    def create_dataset(self, root: str) -> data.Dataset:
+        return Luo2020(root, return_arrays=True, **self._dataset_options())
+
+    def add_traces(self, fig: go.Figure, target: Dict[str, Any]) -> None:
+        names = list(target["keypoint_names"])
+        points = target["keypoints"][[names.index(name) for name in self.skeleton]]
+        fig.add_trace(go.Scatter(x=points[:, 0], y=points[:, 1], text=self.skeleton))
+
+
+class Bang2020Renderer(Renderer):
+    name = "bang2020"
+
+    def create_dataset(self, root: str) -> data.Dataset:
+        return Bang2020(root, return_arrays=True, **self._dataset_options())
+
+    def add_traces(self, fig: go.Figure, target: Dict[str, Any]) -> None:
+        # every phrase describes one region, so every region keeps its own legend entry
+        for box, phrase in zip(target["boxes"], target["phrases"]):
+            x, y = boxes_path(box)
+            fig.add_trace(batched_trace(x, y, phrase, fill=True, webgl=self.webgl, fillcolor="rgba(0,0,0,0)"))
+
+
+class ACIDRenderer(Renderer):
+    name = "ACID"
+
+    def create_dataset(self, root: str) -> data.Dataset:
+        # parsed when the dataset is loaded, not by the first category filter in a callback, and in the
+        # loading thread: a process pool forked from the threads of the registry or the server could deadlock
+        return ACID(root, eager=True, num_workers=0, return_arrays=True, **self._dataset_options())
+
+    def add_traces(self, fig: go.Figure, target: Dict[str, Any]) -> None:
+        text = np.array(
+            [
+                f"<b>pose:</b> {pose}<br><b>truncated:</b> {bool(truncated)}<br><b>difficult:</b> {bool(difficult)}"
+                for pose, truncated, difficult in zip(target["poses"], target["truncated"], target["difficult"])
+            ],
+            dtype=object,
+        )
+        names, groups = group_by(target["names"])
+
+        for i, name in enumerate(names):
+            x, y = boxes_path(target["boxes"][groups == i])
+            fig.add_trace(
+                batched_trace(
+                    x,
+                    y,
+                    name,
+                    fill=True,
+                    webgl=self.webgl,
+                    fillcolor="rgba(0,0,0,0)",
+                    text=np.repeat(text[groups == i], BOX_POINTS),
+                )
+            )
+
+
+class MOCSRenderer(Renderer):
+    name = "MOCS"
+
+    colors = px.colors.qualitative.Plotly
+
+    def create_dataset(self, root: str) -> data.Dataset:
+        return data.ConcatDataset(
+            [
+                MOCS(root, "train", compact=True, return_arrays=True, **self._dataset_options()),
+                MOCS(root, "val", compact=True, return_arrays=True, **self._dataset_options()),
+            ]
+        )
+
+    def add_traces(self, fig: go.Figure, target: Dict[str, Any]) -> None:
+        categories, groups = group_by(target["categories"])
+        # category of every segmentation part and of every vertex
+        part_groups = np.repeat(groups, np.diff(target["part_offsets"]))
+        part_lengths = np.diff(target["polygon_offsets"])
+        vertex_groups = np.repeat(part_groups, part_lengths)
+
+        for i, category in enumerate(categories):
+            color = self.colors[i % len(self.colors)]
+            x, y = boxes_path(target["boxes"][groups == i])
+            fig.add_trace(
+                batched_trace(x, y, category, color, webgl=self.webgl, legendgroup=category, showlegend=False)
+            )
+
+            lengths = part_lengths[part_groups == i]
+            if len(lengths):
+                offsets = np.concatenate([[0], np.cumsum(lengths)])
+                x, y = polygons_path(target["polygons"][vertex_groups == i], offsets)
+                fig.add_trace(
+                    batched_trace(x, y, category, color, fill=True, webgl=self.webgl, legendgroup=category)
+                )
+
+
+def default_renderers(webgl: bool = False, cache: Optional[bool] = None) -> List[Renderer]:
+    return [
+        Luo2020Renderer(webgl, cache),
+        Bang2020Renderer(webgl, cache),
+        ACIDRenderer(webgl, cache),
+        MOCSRenderer(webgl, cache),
+    ]
@@ -0,0 +1,92 @@
+"""Production entry point of the visualiser.
+
+    python serve.py --root data/ --workers 4 --threads 8
+
+The datasets are built with memory-mapped annotation caches and fully loaded before any
+worker starts. With gunicorn installed, the app is created once in the master process
+and forked into ``--workers`` processes of ``--threads`` threads each, so the workers
+share the loaded annotations instead of loading them again. Without gunicorn the app
+runs in a single process on the threaded werkzeug server.
+
+Thumbnails are written to ``--thumbnail-dir`` and served as static files with long
+cache lifetimes, so figures only hold their URL and browsers download each image once.
+"""
+import argparse
+import os
+from typing import Optional
+
+from dash import Dash
+from flask import Flask, send_from_directory
+
+from app import create_app
+from callbacks import create_registry
+from renderers import default_renderers
+from thumbnails import Thumbnailer
+
+THUMBNAIL_URL = "/thumbnails"
+
+
+def create_production_app(root: str = "data/", thumbnail_dir: Optional[str] = None, webgl: bool = False) -> Dash:
+    renderers = default_renderers(webgl=webgl, cache=True)
+    datasets = create_registry(renderers, root)
+    thumbnails = Thumbnailer(directory=thumbnail_dir or os.path.join(root, ".thumbnails"), url_prefix=THUMBNAIL_URL)
+
+    app = create_app(renderers=renderers, datasets=datasets, thumbnails=thumbnails)
+    add_thumbnail_route(app.server, thumbnails)
+
+    # load everything before the workers are forked, so that they share the datasets
+    for name in datasets.names():
+        try:
+            datasets.get(name)
+        except Exception:
+            pass  # reported by the registry, and again when the dataset is selected
+    return app
+
+
+def add_thumbnail_route(server: Flask, thumbnails: Thumbnailer, max_age: int = 365 * 24 * 3600) -> None:
+    """Serve the thumbnail store of ``thumbnails`` under its ``url_prefix``."""
+
+    @server.route(f"{thumbnails.url_prefix}/<path:path>")
+    def thumbnail(path: str):
+        return send_from_directory(thumbnails.directory, path, max_age=max_age)
+
+
+def serve(app: Dash, bind: str, workers: int, threads: int) -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn is not installed, serving from a single process")
+        host, _, port = bind.rpartition(":")
+        app.run(host=host or "127.0.0.1", port=int(port), threaded=True, debug=False)
+        return
+
+    class Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", bind)
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            return app.server
+
+    Application().run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the construction dataset visualiser")
+    parser.add_argument("--root", default="data/", help="directory of the datasets")
+    parser.add_argument("--bind", default="0.0.0.0:8050", help="host:port to listen on")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="number of processes")
+    parser.add_argument("--threads", type=int, default=8, help="number of threads per process")
+    parser.add_argument("--thumbnail-dir", help="directory of the thumbnails, defaults to <root>/.thumbnails")
+    parser.add_argument("--webgl", action="store_true", help="draw the annotations with WebGL")
+    args = parser.parse_args()
+
+    app = create_production_app(args.root, args.thumbnail_dir, args.webgl)
+    serve(app, args.bind, args.workers, args.threads)
+
+
+if __name__ == "__main__":
+    main()
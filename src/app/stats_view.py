@@ -0,0 +1,63 @@
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from datasets.stats import AREA_EDGES, DatasetStatistics
+
+
+def create_stats_figure(stats: DatasetStatistics, max_classes: int = 30) -> go.Figure:
+    """Plot the class frequencies, box area histogram and image sizes of a dataset."""
+    fig = make_subplots(
+        rows=1,
+        cols=3,
+        subplot_titles=(
+            f"Objects per class ({stats.num_objects} objects)",
+            "Box areas (px²)",
+            f"Image sizes ({stats.num_images} images)",
+        ),
+    )
+    fig.update_layout(margin=dict(l=20, r=20, t=40, b=20), showlegend=False)
+
+    order = np.argsort(-stats.class_counts, kind="stable")[:max_classes]
+    fig.add_trace(
+        go.Bar(
+            x=[stats.categories[i] for i in order],
+            y=stats.class_counts[order],
+            customdata=stats.image_counts[order],
+            hovertemplate="%{x}: %{y} objects in %{customdata} images<extra></extra>",
+        ),
+        row=1,
+        col=1,
+    )
+
+    used = np.flatnonzero(stats.area_counts)
+    if len(used):
+        bins = np.arange(used[0], used[-1] + 1)
+        fig.add_trace(
+            go.Bar(
+                x=[f"{int(AREA_EDGES[i])}-{int(AREA_EDGES[i + 1])}" for i in bins],
+                y=stats.area_counts[bins],
+                hovertemplate="%{x} px²: %{y} boxes<extra></extra>",
+            ),
+            row=1,
+            col=2,
+        )
+
+    sizes, counts = stats.resolutions()
+    if len(sizes):
+        fig.add_trace(
+            go.Scatter(
+                x=sizes[:, 0],
+                y=sizes[:, 1],
+                mode="markers",
+                marker=dict(size=6 + 24 * np.sqrt(counts / counts.max())),
+                customdata=counts,
+                hovertemplate="%{x}x%{y}: %{customdata} images<extra></extra>",
+            ),
+            row=1,
+            col=3,
+        )
+    fig.update_xaxes(title_text="width", row=1, col=3)
+    fig.update_yaxes(title_text="height", row=1, col=3)
+
+    return fig
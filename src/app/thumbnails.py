@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from typing import Optional
+
+from PIL import Image, features
+
+
+class Thumbnailer:
+    """Encodes the images shown in the figures as small lossy data URIs.
+
+    Images are scaled down so that their longer side is at most ``max_side`` and encoded as
+    WebP, or JPEG if PIL was built without WebP. The layout image is stretched back to the
+    original size in the figure, so the annotations keep their original pixel coordinates.
+
+    With ``directory`` set, the encoded thumbnails are also stored on disk, keyed by the
+    path of the source image, and reused while they are newer than the source image. If
+    ``url_prefix`` is set as well, figures reference the stored thumbnails by URL instead
+    of embedding them, and the server has to serve ``directory`` under ``url_prefix``
+    (see ``serve.py``). Browsers can then cache the thumbnails.
+
+    Args:
+        max_side (int, optional): Maximum width and height of the thumbnails.
+        quality (int, optional): Encoder quality, from 0 to 100.
+        format (string, optional): ``"WEBP"`` or ``"JPEG"``, by default WebP if available.
+        directory (string, optional): Directory of the on-disk thumbnail store.
+        url_prefix (string, optional): URL under which ``directory`` is served.
+    """
+
+    def __init__(
+        self,
+        max_side: int = 1280,
+        quality: int = 80,
+        format: Optional[str] = None,
+        directory: Optional[str] = None,
+        url_prefix: Optional[str] = None,
+    ) -> None:
+        if url_prefix is not None and directory is None:
+            raise ValueError("url_prefix requires a thumbnail directory")
+        if format is None:
+            format = "WEBP" if features.check("webp") else "JPEG"
+        self.max_side = max_side
+        self.quality = quality
+        self.format = format.upper()
+        self.directory = directory
+        self.url_prefix = url_prefix
+
+    @property
+    def mime_type(self) -> str:
+        return f"image/{self.format.lower()}"
+
+    def source(self, image: Image.Image) -> str:
+        """Return the URL or data URI of the thumbnail of ``image`` to use as layout image source."""
+        data = None
+        file = self._thumbnail_file(image)
+        if file is not None and self.url_prefix is not None:
+            if not _is_newer(file, image.filename):
+                _write_atomic(file, self.encode(image))
+            if os.path.exists(file):
+                # the version changes whenever the thumbnail is rewritten, so it can be cached forever
+                path = os.path.relpath(file, self.directory).replace(os.sep, "/")
+                return f"{self.url_prefix}/{path}?v={os.stat(file).st_mtime_ns}"
+
+        if file is not None and _is_newer(file, image.filename):
+            with open(file, "rb") as fp:
+                data = fp.read()
+
+        if data is None:
+            data = self.encode(image)
+            if file is not None:
+                _write_atomic(file, data)
+
+        return f"data:{self.mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+    def encode(self, image: Image.Image) -> bytes:
+        """Return the encoded thumbnail of ``image``, which is left unchanged."""
+        width, height = image.size
+        ratio = self.max_side / max(width, height)
+        if ratio < 1:
+            size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+            image = _resize(image, size)
+        if image.mode not in ("RGB", "RGBA") or (image.mode == "RGBA" and self.format == "JPEG"):
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        image.save(buffer, self.format, quality=self.quality)
+        return buffer.getvalue()
+
+    def _thumbnail_file(self, image: Image.Image) -> Optional[str]:
+        filename = getattr(image, "filename", None)
+        if self.directory is None or not filename:
+            return None
+        key = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()
+        extension = "jpg" if self.format == "JPEG" else self.format.lower()
+        return os.path.join(self.directory, f"{self.max_side}-{self.quality}", key[:2], f"{key}.{extension}")
+
+
+def _resize(image: Image.Image, size) -> Image.Image:
+    # draft() shrinks the image it is called on, so JPEGs are decoded at a reduced scale
+    # from a fresh handle on the file, never from the caller's image
+    filename = getattr(image, "filename", None)
+    if image.format == "JPEG" and filename:
+        with Image.open(filename) as fresh:
+            if fresh.size == image.size:
+                fresh.draft(fresh.mode, size)
+                return fresh.resize(size, Image.BILINEAR)
+    return image.resize(size, Image.BILINEAR)
+
+
+def _is_newer(file: str, source: str) -> bool:
+    try:
+        return os.stat(file).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+
+def _write_atomic(file: str, data: bytes) -> None:
+    tmp = f"{file}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        with open(tmp, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp, file)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
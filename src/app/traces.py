@@ -0,0 +1,67 @@
+"""Batched plotly traces.
+
+Drawing every box or polygon as its own trace makes the size of a figure and the time
+plotly.js takes to draw it grow with the number of objects. The functions here join many
+shapes into the ``x`` and ``y`` arrays of a single trace, separated by ``NaN`` gaps, so
+that a figure has one trace per category however many objects an image holds.
+"""
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import plotly.graph_objects as go
+
+Trace = Union[go.Scatter, go.Scattergl]
+
+BOX_POINTS = 6  # four corners, the first corner again and the gap
+
+
+def boxes_path(boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the ``x`` and ``y`` of closed outlines of ``(N, 4)`` ``xyxy`` boxes, ``BOX_POINTS`` per box."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x0, y0, x1, y1 = boxes.T
+    gap = np.full(len(boxes), np.nan)
+    x = np.stack([x0, x0, x1, x1, x0, gap], axis=1).ravel()
+    y = np.stack([y0, y1, y1, y0, y0, gap], axis=1).ravel()
+    return x, y
+
+
+def polygons_path(vertices: np.ndarray, offsets: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the ``x`` and ``y`` of polygons whose vertices ``offsets[i]:offsets[i + 1]`` are in ``vertices``."""
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(offsets[1:], dtype=np.int64)
+    points = np.insert(vertices, ends, np.nan, axis=0)
+    return points[:, 0], points[:, 1]
+
+
+def batched_trace(
+    x: np.ndarray,
+    y: np.ndarray,
+    name: str,
+    color: Optional[str] = None,
+    fill: bool = False,
+    webgl: bool = False,
+    **kwargs,
+) -> Trace:
+    """Return a single line trace drawing all the shapes of ``x`` and ``y``.
+
+    Args:
+        x (np.ndarray): X coordinates, shapes separated by ``NaN``.
+        y (np.ndarray): Y coordinates, shapes separated by ``NaN``.
+        name (string): Name of the trace in the legend.
+        color (string, optional): Line color.
+        fill (bool, optional): If True, every shape is filled.
+        webgl (bool, optional): If True, a ``Scattergl`` trace is returned.
+    """
+    scatter = go.Scattergl if webgl else go.Scatter
+    if fill:
+        kwargs["fill"] = "toself"
+    if color is not None:
+        kwargs["line"] = dict(color=color)
+    return scatter(x=x, y=y, name=name, mode="lines", connectgaps=False, **kwargs)
+
+
+def group_by(labels: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the sorted unique ``labels`` and the index of the unique label of every label."""
+    if len(labels) == 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=np.int64)
+    return np.unique(np.asarray(labels, dtype=object), return_inverse=True)
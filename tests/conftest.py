@@ -0,0 +1,102 @@
+import json
+import os
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+NUM_IMAGES = 6
+
+
+def _save_image(path: str, width: int = 64, height: int = 48) -> None:
+    Image.fromarray((np.random.rand(height, width, 3) * 255).astype("uint8")).save(path, quality=80)
+
+
+def make_datasets(root: str, num_images: int = NUM_IMAGES, seed: int = 0) -> None:
+    """Write small random versions of the four datasets under ``root``, in their original layout."""
+    random.seed(seed)
+    np.random.seed(seed)
+
+    categories = [{"id": 3 + i, "name": f"category{i}"} for i in range(4)]
+    for split in ("train", "val"):
+        images_dir = os.path.join(root, "MOCS", f"instances_{split}")
+        os.makedirs(images_dir)
+        images, annotations = [], []
+        for i in range(num_images):
+            file_name = f"{split}_{i}.jpg"
+            _save_image(os.path.join(images_dir, file_name))
+            images.append({"id": 100 + i, "file_name": file_name, "width": 64, "height": 48})
+            for _ in range(random.randint(0, 3)):
+                parts = [[random.randint(0, 60) for _ in range(2 * random.randint(3, 5))]
+                         for _ in range(random.randint(1, 2))]
+                annotations.append({
+                    "id": len(annotations),
+                    "image_id": 100 + i,
+                    "category_id": random.choice(categories)["id"],
+                    "bbox": [random.randint(0, 30), 2, 10, 7],
+                    "segmentation": parts,
+                })
+        random.shuffle(annotations)
+        with open(os.path.join(root, "MOCS", f"instances_{split}.json"), "w") as fp:
+            json.dump({"images": images, "categories": categories, "annotations": annotations}, fp)
+
+    acid = os.path.join(root, "ACID")
+    os.makedirs(os.path.join(acid, "ACID_Images"))
+    os.makedirs(os.path.join(acid, "ACID_Annotations"))
+    for i in range(num_images):
+        _save_image(os.path.join(acid, "ACID_Images", f"img{i:04d}.jpg"))
+        objects = "".join(
+            f"<object><name>{random.choice(['excavator', 'dump_truck', 'mixer'])}</name><pose>Unspecified</pose>"
+            f"<truncated>{random.randint(0, 1)}</truncated><difficult>{random.randint(0, 1)}</difficult>"
+            f"<bndbox><xmin>{random.randint(0, 20)}</xmin><ymin>{random.randint(0, 20)}</ymin>"
+            f"<xmax>{random.randint(30, 60)}</xmax><ymax>{random.randint(25, 45)}</ymax></bndbox></object>"
+            for _ in range(random.randint(1, 4))
+        )
+        with open(os.path.join(acid, "ACID_Annotations", f"img{i:04d}.xml"), "w") as fp:
+            fp.write(f"<annotation><filename>img{i:04d}.jpg</filename>{objects}</annotation>")
+
+    luo = os.path.join(root, "luo2020", "equipment_pose_dataset")
+    os.makedirs(os.path.join(luo, "images"))
+    os.makedirs(os.path.join(luo, "labels"))
+    keypoints = ["body_end", "cab_boom", "boom_arm", "arm_bucket", "bucket_end_left", "bucket_end_right"]
+    rows = ["image," + ",".join(f"{keypoint}_{axis}" for keypoint in keypoints for axis in "xy")]
+    for i in range(num_images):
+        _save_image(os.path.join(luo, "images", f"{i}.jpg"))
+        rows.append(f"{i}.jpg," + ",".join(str(random.randint(0, 60)) for _ in range(2 * len(keypoints))))
+    with open(os.path.join(luo, "labels", "labels.csv"), "w") as fp:
+        fp.write("\n".join(rows) + "\n")
+
+    bang = os.path.join(root, "bang2020")
+    os.makedirs(os.path.join(bang, "UAVData"))
+    regions = {}
+    for i in range(num_images):
+        _save_image(os.path.join(bang, "UAVData", f"uav{i}.jpg"), 128, 96)
+        regions[f"uav{i}.jpg123"] = {
+            "filename": f"uav{i}.jpg",
+            "size": 123,
+            "regions": {
+                str(k): {
+                    "shape_attributes": {
+                        "name": "rect",
+                        "x": random.randint(0, 50),
+                        "y": random.randint(0, 40),
+                        "width": 20,
+                        "height": 15,
+                    },
+                    "region_attributes": {"phrase": random.choice(["a truck", "an excavator digging", "workers"])},
+                }
+                for k in range(random.randint(1, 3))
+            },
+            "file_attributes": {},
+        }
+    with open(os.path.join(bang, "via_region_data_final.json"), "w") as fp:
+        json.dump(regions, fp)
+
+
+@pytest.fixture
+def data_root(tmp_path):
+    """Root directory of small random versions of all datasets."""
+    root = tmp_path / "data"
+    make_datasets(str(root))
+    return str(root)
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+import pytest
+
+from datasets import MOCS, cache
+from datasets.cache import AnnotationCache, DirectoryCache
+
+
+def _touch(file: str) -> None:
+    stat = os.stat(file)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture
+def source(tmp_path):
+    file = tmp_path / "annotations.txt"
+    file.write_text("1 2 3")
+    return str(file)
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    hashed = []
+    sha1 = cache._sha1
+
+    def counting_sha1(file):
+        hashed.append(file)
+        return sha1(file)
+
+    monkeypatch.setattr(cache, "_sha1", counting_sha1)
+    return hashed
+
+
+def _save(path: str, sources, version: int = 1, **kwargs) -> None:
+    AnnotationCache(path, sources, version, **kwargs).save({"values": np.arange(3), "names.data": np.zeros(2)})
+
+
+def test_annotation_cache_roundtrip(tmp_path, source):
+    path = str(tmp_path / "annotations.cache")
+    saved = AnnotationCache(path, [source]).save({"values": np.arange(3, dtype=np.int32)})
+    loaded = AnnotationCache(path, [source]).load()
+    assert list(loaded) == ["values"]
+    assert isinstance(loaded["values"], np.memmap) and isinstance(saved["values"], np.memmap)
+    assert loaded["values"].dtype == np.int32
+    np.testing.assert_array_equal(loaded["values"], [0, 1, 2])
+
+
+def test_annotation_cache_is_reused_after_a_touch(tmp_path, source, hashes):
+    path = str(tmp_path / "annotations.cache")
+    _save(path, [source])
+    _touch(source)
+
+    hashes.clear()
+    assert AnnotationCache(path, [source]).load() is not None
+    assert hashes == [source]
+    # the new mtime is recorded, the next load does not hash again
+    hashes.clear()
+    assert AnnotationCache(path, [source]).load() is not None
+    assert hashes == []
+
+
+def test_annotation_cache_is_rebuilt_after_a_change(tmp_path, source):
+    path = str(tmp_path / "annotations.cache")
+    _save(path, [source])
+    stat = os.stat(source)
+    with open(source, "w") as fp:
+        fp.write("1 2 4")
+    # same size and mtime, only the content tells the change
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert AnnotationCache(path, [source]).load() is None
+
+
+def test_annotation_cache_is_rebuilt_after_a_version_bump(tmp_path, source):
+    path = str(tmp_path / "annotations.cache")
+    _save(path, [source], version=1)
+    assert AnnotationCache(path, [source], 1).load() is not None
+    assert AnnotationCache(path, [source], 2).load() is None
+    # the version is checked even when the sources are not
+    assert AnnotationCache(path, [source], 2).load(check_sources=False) is None
+
+
+def test_annotation_cache_is_rebuilt_when_the_sources_differ(tmp_path, source):
+    path = str(tmp_path / "annotations.cache")
+    other = tmp_path / "other.txt"
+    other.write_text("4 5 6")
+    _save(path, [source])
+    assert AnnotationCache(path, [source, str(other)]).load() is None
+    os.remove(source)
+    assert AnnotationCache(path, [source]).load() is None
+
+
+def test_stat_sources_are_not_hashed(tmp_path, source, hashes):
+    path = str(tmp_path / "statistics.cache")
+    image = tmp_path / "image.jpg"
+    image.write_bytes(b"image")
+    _save(path, [source], stat_sources=[str(image)])
+    assert hashes == [source]
+
+    hashes.clear()
+    assert AnnotationCache(path, [source], stat_sources=[str(image)]).load() is not None
+    _touch(str(image))
+    assert AnnotationCache(path, [source], stat_sources=[str(image)]).load() is None
+    assert hashes == []
+
+
+def test_directory_cache(tmp_path):
+    directory = tmp_path / "images"
+    directory.mkdir()
+    (directory / "a.jpg").write_bytes(b"a")
+    path = str(tmp_path / "images.manifest")
+
+    directory_cache = DirectoryCache(path, [str(directory)])
+    directory_cache.snapshot()
+    directory_cache.save({"values": np.arange(3)})
+    assert DirectoryCache(path, [str(directory)]).load() is not None
+    # files rewritten in place are not noticed, only the entries of the directory
+    (directory / "a.jpg").write_bytes(b"changed")
+    assert DirectoryCache(path, [str(directory)]).load() is not None
+    assert DirectoryCache(path, [str(directory)], version=2).load() is None
+
+    (directory / "b.jpg").write_bytes(b"b")
+    _touch(str(directory))
+    assert DirectoryCache(path, [str(directory)]).load() is None
+
+
+def test_dataset_parses_only_when_the_cache_is_stale(data_root, monkeypatch):
+    parsed = []
+    parse = MOCS._parse_annotations
+
+    def counting_parse(self):
+        parsed.append(self.split)
+        return parse(self)
+
+    monkeypatch.setattr(MOCS, "_parse_annotations", counting_parse)
+    json_file = os.path.join(data_root, "MOCS", "instances_train.json")
+
+    expected = MOCS(data_root, "train").image_ids.tolist()
+    assert len(parsed) == 1
+    _touch(json_file)
+    assert MOCS(data_root, "train").image_ids.tolist() == expected
+    assert len(parsed) == 1
+
+    with open(json_file) as fp:
+        text = fp.read()
+    with open(json_file, "w") as fp:
+        fp.write(text.replace('"id": 100,', '"id": 99,', 1))
+    assert MOCS(data_root, "train").image_ids.tolist() == [99] + expected[1:]
+    assert len(parsed) == 2
+
+    monkeypatch.setattr(MOCS, "annotation_version", MOCS.annotation_version + 1)
+    MOCS(data_root, "train")
+    assert len(parsed) == 3
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import pytest
+
+import datasets
+from datasets import ShardedDataset
+from datasets.bundle import Bundle
+from datasets.compile import compile_bundle, main
+from datasets.stats import STATS_VERSION
+
+from .test_datasets import assert_same
+
+OPTIONS = {
+    "ACID": {"num_workers": 0, "return_arrays": True},
+    "Bang2020": {},
+    "Luo2020": {"return_arrays": True},
+    "MOCS": {"split": "train", "compact": True},
+}
+
+
+@pytest.mark.parametrize("name", sorted(OPTIONS))
+def test_compile_load_and_stream(data_root, tmp_path, name):
+    options = OPTIONS[name]
+    split = {"split": options["split"]} if "split" in options else {}
+    path = str(tmp_path / "bundles" / name)
+    bundle = compile_bundle(name, data_root, path, shards=True, shard_size=1, num_workers=0, **split)
+    source = getattr(datasets, name)(data_root, **options)
+    expected = [source[i] for i in range(len(source))]
+    # the shards hold the targets of the dataset with its default options
+    default = getattr(datasets, name)(data_root, **split)
+    expected_shards = [default._load_target(i) for i in range(len(default))]
+    assert isinstance(bundle, Bundle) and len(bundle) == len(source)
+    assert bundle.statistics(STATS_VERSION) is not None
+
+    # the annotations are read from the bundle only
+    for file in source._annotation_sources():
+        os.rename(file, f"{file}.moved")
+    bundled = getattr(datasets, name)(data_root, bundle=path, **options)
+    assert len(bundled) == len(source)
+    for i, (image, target) in enumerate(expected):
+        assert bundled._image_file(i) == source._image_file(i)
+        bundled_image, bundled_target = bundled[i]
+        assert bundled_image.size == image.size
+        assert_same(bundled_target, target)
+
+    sharded = ShardedDataset(bundle.shards_dir)
+    assert len(sharded) == len(source) and len(sharded.shards) == len(source)
+    for (image, target), (expected_image, _), expected_target in zip(sharded, expected, expected_shards):
+        assert image.size == expected_image.size
+        assert_same(target, expected_target)
+
+
+def test_bundle_of_another_dataset_is_refused(data_root, tmp_path):
+    path = str(tmp_path / "bundle")
+    compile_bundle("MOCS", data_root, path, split="val", statistics=False)
+    with pytest.raises(ValueError):
+        datasets.MOCS(data_root, "train", bundle=path)
+    with pytest.raises(ValueError):
+        compile_bundle("ACID", data_root, path, split="val")
+
+
+def test_only_bundles_and_empty_directories_are_replaced(data_root, tmp_path):
+    path = tmp_path / "bundle"
+    path.mkdir()
+    compile_bundle("Luo2020", data_root, str(path), statistics=False)
+    # an existing bundle is replaced
+    compile_bundle("MOCS", data_root, str(path), split="train", statistics=False)
+    assert Bundle(str(path)).meta["dataset"] == "MOCS"
+
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "notes.txt").write_text("keep me")
+    with pytest.raises(FileExistsError):
+        compile_bundle("Luo2020", data_root, str(other), statistics=False)
+    with pytest.raises(FileExistsError):
+        compile_bundle("Luo2020", data_root, data_root, statistics=False)
+    assert (other / "notes.txt").read_text() == "keep me"
+    assert os.path.isdir(os.path.join(data_root, "MOCS"))
+    # nothing is left behind next to the refused directory
+    assert sorted(os.listdir(tmp_path)) == ["bundle", "data", "other"]
+
+
+def test_main_reports_a_refused_directory(data_root, tmp_path, monkeypatch, capsys):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "notes.txt").write_text("keep me")
+    monkeypatch.setattr(sys, "argv", ["compile", "Luo2020", data_root, str(other)])
+    with pytest.raises(SystemExit) as e:
+        main()
+    assert e.value.code == 2
+    assert "not a dataset bundle" in capsys.readouterr().err
+    assert (other / "notes.txt").read_text() == "keep me"
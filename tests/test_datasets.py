@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from datasets import ACID, Bang2020, Luo2020, MOCS
+
+FACTORIES = {
+    "ACID": lambda root, **kwargs: ACID(root, num_workers=0, **kwargs),
+    "ACID-eager": lambda root, **kwargs: ACID(root, eager=True, num_workers=0, **kwargs),
+    "Bang2020": Bang2020,
+    "Luo2020": Luo2020,
+    "MOCS": lambda root, **kwargs: MOCS(root, "train", **kwargs),
+    "MOCS-compact": lambda root, **kwargs: MOCS(root, "train", compact=True, **kwargs),
+}
+
+
+def assert_same(actual, expected) -> None:
+    """Compare targets made of dicts, lists, tuples and arrays, including the array shapes."""
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and actual.keys() == expected.keys()
+        for key in expected:
+            assert_same(actual[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert isinstance(actual, (list, tuple)) and len(actual) == len(expected)
+        for actual_item, expected_item in zip(actual, expected):
+            assert_same(actual_item, expected_item)
+    elif isinstance(expected, np.ndarray):
+        assert isinstance(actual, np.ndarray)
+        assert actual.shape == expected.shape
+        np.testing.assert_array_equal(actual, expected)
+    else:
+        assert actual == expected
+
+
+@pytest.fixture(params=sorted(FACTORIES))
+def factory(request):
+    return FACTORIES[request.param]
+
+
+@pytest.mark.parametrize("return_arrays", [False, True])
+def test_negative_indices(data_root, factory, return_arrays):
+    dataset = factory(data_root, return_arrays=return_arrays)
+    n = len(dataset)
+    for index in (-1, -n):
+        image, target = dataset[index]
+        expected_image, expected_target = dataset[n + index]
+        assert image.size == expected_image.size
+        assert_same(target, expected_target)
+
+    for index in (n, -n - 1):
+        with pytest.raises(IndexError):
+            dataset[index]
+        with pytest.raises(IndexError):
+            dataset.__getitems__([0, index])
+
+
+@pytest.mark.parametrize("return_arrays", [False, True])
+def test_getitems_matches_getitem(data_root, factory, return_arrays):
+    dataset = factory(data_root, return_arrays=return_arrays)
+    n = len(dataset)
+    indices = [-1, 0, 2, n - 1, 2, -n]
+    samples = dataset.__getitems__(indices)
+    assert len(samples) == len(indices)
+    for index, (image, target) in zip(indices, samples):
+        expected_image, expected_target = dataset[index]
+        assert image.size == expected_image.size
+        assert_same(target, expected_target)
+    assert dataset.__getitems__([]) == []
+
+
+def test_resized_images_are_cached_until_the_image_changes(data_root, tmp_path):
+    resize_cache_dir = str(tmp_path / "resized")
+    dataset = Luo2020(data_root, max_side=32, resize_cache_dir=resize_cache_dir)
+    file = dataset._image_file(0)
+    cached_file = os.path.join(resize_cache_dir, "32", os.path.relpath(file, data_root))
+
+    image, _ = dataset[0]
+    assert image.size == (32, 24)
+    assert os.path.isfile(cached_file)
+    # reused while the image is unchanged
+    os.utime(cached_file, ns=(0, os.stat(file).st_mtime_ns + 10 ** 9))
+    assert dataset[0][0].filename == cached_file
+
+    # an image replaced at the same path is resized again, not served from the cache
+    Image.new("RGB", (64, 48), (255, 0, 0)).save(file)
+    os.utime(file, ns=(0, os.stat(cached_file).st_mtime_ns + 10 ** 9))
+    image, _ = dataset[0]
+    assert image.getpixel((16, 12))[0] > 200
+    assert Image.open(cached_file).getpixel((16, 12))[0] > 200
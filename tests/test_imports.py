@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _modules_after(statement: str) -> set:
+    """Run ``statement`` in a fresh interpreter and return the modules it imported."""
+    script = (
+        "import json, sys\n"
+        "before = set(sys.modules)\n"
+        f"{statement}\n"
+        "print(json.dumps(sorted(set(sys.modules) - before)))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], cwd=REPO, check=True, capture_output=True, text=True)
+    return set(json.loads(output.stdout.strip().splitlines()[-1]))
+
+
+def test_bare_import_only_imports_the_package():
+    modules = _modules_after("import datasets")
+    assert {module for module in modules if module.startswith("datasets")} == {"datasets"}
+    assert "numpy" not in modules
+    assert "torch" not in modules
+
+
+def test_importing_one_dataset_does_not_import_the_others():
+    modules = _modules_after("from datasets import ACID")
+    assert "datasets.acid" in modules
+    for module in ("pandas", "datasets.luo2020", "datasets.bang2020", "datasets.mocs", "datasets.shards"):
+        assert module not in modules
+
+
+def test_luo2020_imports_pandas_only_to_parse():
+    modules = _modules_after("from datasets import Luo2020")
+    assert "datasets.luo2020" in modules
+    assert "pandas" not in modules
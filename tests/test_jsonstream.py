@@ -0,0 +1,61 @@
+import io
+import json
+
+import pytest
+
+from datasets import jsonstream
+from datasets.jsonstream import iter_arrays
+
+DOCUMENT = {
+    "info": {"description": "test", "nested": {"list": [1, [2, {"x": "]}"}]]}},
+    "images": [{"id": 10, "file_name": "a.jpg"}, {"id": 11, "file_name": "no \\\"annotations\\\".jpg"}],
+    "licenses": [],
+    "categories": [{"id": 1, "name": "Worker"}, {"id": 4, "name": "Excavator"}],
+    "annotations": [
+        {"id": 1, "image_id": 11, "category_id": 4, "bbox": [1, 2, 30, 40], "segmentation": [[1, 2, 31, 2, 31, 42]]},
+        {"id": 2, "image_id": 10, "category_id": 1, "bbox": [5.5, 6.25, 1e-3, -12],
+         "segmentation": [[5.5, 6.25, 15.5, 6.25, 15.5, 18.25], [7, 8, 9, 10, 11, 12]], "area": None},
+    ],
+}
+
+
+def _stream(text: str, keys, chunk_size: int) -> list:
+    return list(iter_arrays(io.StringIO(text), keys, chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_iter_arrays_matches_json_load(chunk_size):
+    for indent in (None, 2):
+        text = json.dumps(DOCUMENT, indent=indent)
+        data = json.loads(text)
+        keys = ("images", "categories", "annotations")
+        expected = [(key, item) for key in data if key in keys for item in data[key]]
+        assert _stream(text, keys, chunk_size) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_iter_arrays_edge_cases(chunk_size):
+    assert _stream("{}", {"a"}, chunk_size) == []
+    assert _stream(' { "a" : [ ] , "b" : [1] } ', {"a", "b"}, chunk_size) == [("b", 1)]
+    # a key that does not hold an array is skipped like any other value
+    assert _stream('{"a": {"a": [1]}, "b": ["x\\"]", 2.5e-3, null]}', {"a", "b"}, chunk_size) == [
+        ("b", 'x"]'), ("b", 2.5e-3), ("b", None)
+    ]
+    with pytest.raises(ValueError):
+        _stream('{"a": [1, 2', {"a"}, chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64])
+def test_iter_arrays_skips_other_values_element_by_element(monkeypatch, chunk_size):
+    class Reader(jsonstream._Reader):
+        def _fill(self) -> bool:
+            filled = super()._fill()
+            # the buffer never holds much more than a chunk, not the skipped values
+            assert len(self.buffer) <= chunk_size + 16
+            return filled
+
+    monkeypatch.setattr(jsonstream, "_Reader", Reader)
+    rows = [[i, {"value": i * 0.5, "name": f"row {i}", "empty": [], "nested": [[{}]]}] for i in range(2000)]
+    skipped = {"rows": rows}
+    text = json.dumps({"skipped": skipped, "after": [1, 2], "also": list(range(1000))})
+    assert _stream(text, {"after"}, chunk_size) == [("after", 1), ("after", 2)]
@@ -0,0 +1,113 @@
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from datasets import MOCS
+
+CATEGORIES = [{"id": 1, "name": "Worker"}, {"id": 4, "name": "Excavator"}, {"id": 7, "name": "Truck \"big\""}]
+
+ANNOTATIONS = [
+    {"id": 1, "image_id": 11, "category_id": 4, "bbox": [1, 2, 30, 40],
+     "segmentation": [[1, 2, 31, 2, 31, 42, 1, 42]], "area": 1200, "iscrowd": 0},
+    {"id": 2, "image_id": 10, "category_id": 1, "bbox": [5.5, 6.25, 10, 12],
+     "segmentation": [[5.5, 6.25, 15.5, 6.25, 15.5, 18.25], [7, 8, 9, 10, 11, 12, 13, 14]], "area": 60.5},
+    {"id": 3, "image_id": 11, "category_id": 7, "bbox": [0, 0, 3, 3],
+     "segmentation": [[0, 0, 3, 0, 3, 3]], "area": 4.5},
+    {"id": 4, "image_id": 13, "category_id": 1, "bbox": [2, 2, 2, 2], "segmentation": [], "area": 0},
+]
+
+IMAGES = [
+    {"id": 10, "file_name": "a.jpg", "width": 64, "height": 48},
+    {"id": 11, "file_name": "b.jpg", "width": 64, "height": 48},
+    {"id": 12, "file_name": "no annotations.jpg", "width": 64, "height": 48},
+    {"id": 13, "file_name": "c.jpg", "width": 64, "height": 48},
+]
+
+
+def _document() -> dict:
+    return {
+        "info": {"description": "test", "nested": {"list": [1, [2, {"x": "]}"}]]}},
+        "images": IMAGES,
+        "licenses": [],
+        "categories": CATEGORIES,
+        "annotations": ANNOTATIONS,
+    }
+
+
+@pytest.fixture
+def root(tmp_path):
+    os.makedirs(tmp_path / "MOCS" / "instances_train")
+    with open(tmp_path / "MOCS" / "instances_train.json", "w") as fp:
+        json.dump(_document(), fp, indent=1)
+    return str(tmp_path)
+
+
+def _expected_targets(json_file: str) -> dict:
+    """The targets built from ``json.load``, as the dict backend used to build them."""
+    with open(json_file) as fp:
+        data = json.load(fp)
+    categories = {category["id"]: category["name"] for category in data["categories"]}
+    targets = {}
+    for annotation in data["annotations"]:
+        targets.setdefault(annotation["image_id"], []).append({
+            "segmentation": [np.reshape(np.array(part), (-1, 2)) for part in annotation["segmentation"]],
+            "bbox": annotation["bbox"],
+            "category": categories[int(annotation["category_id"])],
+        })
+    return targets
+
+
+def _assert_same_targets(actual: list, expected: list) -> None:
+    assert len(actual) == len(expected)
+    for actual_target, expected_target in zip(actual, expected):
+        assert actual_target.keys() == expected_target.keys()
+        assert actual_target["bbox"] == expected_target["bbox"]
+        assert [type(value) for value in actual_target["bbox"]] == [type(value) for value in expected_target["bbox"]]
+        assert actual_target["category"] == expected_target["category"]
+        assert len(actual_target["segmentation"]) == len(expected_target["segmentation"])
+        for actual_part, expected_part in zip(actual_target["segmentation"], expected_target["segmentation"]):
+            np.testing.assert_array_equal(actual_part, expected_part)
+            assert actual_part.shape == expected_part.shape
+            assert actual_part.dtype == expected_part.dtype
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_compact_and_dict_targets_match_json(root, cache):
+    expected = _expected_targets(os.path.join(root, "MOCS", "instances_train.json"))
+    compact = MOCS(root, compact=True, cache=cache)
+    default = MOCS(root, compact=False, cache=cache)
+
+    assert [compact._image_file(i) for i in range(len(compact))] == [
+        os.path.join(root, "MOCS", "instances_train", image["file_name"]) for image in IMAGES
+    ]
+    assert compact.image_ids.tolist() == [image["id"] for image in IMAGES]
+    assert sorted(compact.targets) == sorted(default.targets) == sorted(expected)
+    for image_id, targets in expected.items():
+        _assert_same_targets(compact.targets[image_id], targets)
+        _assert_same_targets(default.targets[image_id], targets)
+    for index, image in enumerate(IMAGES):
+        _assert_same_targets(compact._load_target(index), expected.get(image["id"], []))
+        _assert_same_targets(default._load_target(index), expected.get(image["id"], []))
+
+
+def test_segmentation_parts(root):
+    compact = MOCS(root, compact=True)
+    default = MOCS(root, compact=False)
+    # views of the shared vertices with compact, writable copies made per sample otherwise
+    assert not any(part.flags.writeable for part in compact._load_target(0)[0]["segmentation"])
+    assert all(part.flags.writeable for part in default._load_target(0)[0]["segmentation"])
+    part = default._load_target(0)[0]["segmentation"][0]
+    part += 1
+    expected = [[5.5, 6.25], [15.5, 6.25], [15.5, 18.25]]
+    np.testing.assert_array_equal(default._load_target(0)[0]["segmentation"][0], expected)
+
+
+def test_default_keeps_only_the_memory_mapped_store(root):
+    compact = MOCS(root, compact=True)
+    default = MOCS(root, compact=False)
+    assert default.targets is default.store
+    # the workers map the same cache files instead of receiving a copy of every target
+    assert len(pickle.dumps(default)) == len(pickle.dumps(compact))
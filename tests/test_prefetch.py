@@ -0,0 +1,35 @@
+import pytest
+from torch.utils.data import DataLoader, Dataset
+
+from datasets import Prefetcher
+
+
+class Squares(Dataset):
+    def __len__(self) -> int:
+        return 20
+
+    def __getitem__(self, index: int):
+        return index, index * index
+
+
+def test_iterator_indices_are_kept_for_every_epoch():
+    prefetcher = Prefetcher(Squares(), indices=(i for i in range(19, -1, -2)), depth=3, num_threads=2)
+    assert len(prefetcher) == 10
+    expected = [(i, i * i) for i in range(19, -1, -2)]
+    assert list(prefetcher) == expected
+    assert list(prefetcher) == expected
+    assert prefetcher.stats.samples == 20
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_stats_count_the_samples_of_the_workers(num_workers):
+    prefetcher = Prefetcher(Squares(), depth=4, num_threads=2)
+    loader = DataLoader(prefetcher, batch_size=None, num_workers=num_workers)
+    assert sorted(index for index, _ in loader) == list(range(20))
+    stats = prefetcher.stats
+    assert stats.samples == 20
+    assert 0 <= stats.stalls <= stats.samples
+    assert 0.0 < stats.mean_queue_depth <= 4
+
+    prefetcher.reset_stats()
+    assert prefetcher.stats.samples == 0
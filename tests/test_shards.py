@@ -0,0 +1,129 @@
+import json
+import os
+from itertools import groupby
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+from torch.utils.data import DataLoader
+
+from datasets import ACID, ShardedDataset, export_shards, shards
+from datasets.shards import INDEX_FILE, read_sample
+
+from .test_datasets import assert_same
+
+NUM_SAMPLES = 10
+
+
+class Numbered:
+    """Samples whose target is their index, with images of different sizes."""
+
+    def __init__(self, directory: str) -> None:
+        self.files = []
+        for i in range(NUM_SAMPLES):
+            file = os.path.join(directory, f"{i}.png")
+            Image.new("L", (i + 1, 2), i).save(file)
+            self.files.append(file)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def _image_file(self, index: int) -> str:
+        return self.files[index]
+
+    def _load_target(self, index: int):
+        return {"index": index}
+
+
+@pytest.fixture
+def sharded_path(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    path = str(tmp_path / "shards")
+    # every sample takes two tar headers and two padded blocks, 2048 bytes, so three samples per shard
+    export_shards(Numbered(str(images)), path, shard_size=5000)
+    return path
+
+
+def _indices(dataset) -> list:
+    return [target["index"] for _, target in dataset]
+
+
+def _shard_order(indices: list) -> list:
+    """Return the shards in the order they were read, checking that each was read whole and in order."""
+    order = []
+    for shard, group in groupby(indices, key=lambda index: index // 3):
+        assert list(group) == list(range(shard * 3, min(shard * 3 + 3, NUM_SAMPLES)))
+        order.append(shard)
+    return order
+
+
+def test_roundtrip(sharded_path):
+    with open(os.path.join(sharded_path, INDEX_FILE)) as fp:
+        index = json.load(fp)
+    assert index["dataset"] == "Numbered"
+    assert [len(shard["samples"]) for shard in index["shards"]] == [3, 3, 3, 1]
+
+    dataset = ShardedDataset(sharded_path)
+    assert len(dataset) == NUM_SAMPLES
+    samples = list(dataset)
+    assert [target["index"] for _, target in samples] == list(range(NUM_SAMPLES))
+    for i, (image, _) in enumerate(samples):
+        assert image.size == (i + 1, 2) and image.getpixel((0, 0)) == i
+
+    image, target = read_sample(sharded_path, index["shards"][2], 1)
+    assert target == {"index": 7} and image.size == (8, 2)
+
+
+def test_transforms(sharded_path):
+    dataset = ShardedDataset(sharded_path, transforms=lambda image, target: (image.size, target["index"] * 2))
+    assert list(dataset) == [((i + 1, 2), i * 2) for i in range(NUM_SAMPLES)]
+
+
+def test_shard_order_is_shuffled_every_epoch(sharded_path):
+    dataset = ShardedDataset(sharded_path, shuffle=True, seed=3)
+    orders = []
+    for epoch in range(4):
+        dataset.set_epoch(epoch)
+        order = _shard_order(_indices(dataset))
+        assert sorted(order) == [0, 1, 2, 3]
+        # the same epoch always gives the same order
+        assert _shard_order(_indices(dataset)) == order
+        orders.append(order)
+    assert len({tuple(order) for order in orders}) > 1
+    assert _indices(ShardedDataset(sharded_path)) == list(range(NUM_SAMPLES))
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_workers_read_every_num_workers_th_shard(sharded_path, monkeypatch, shuffle):
+    dataset = ShardedDataset(sharded_path, shuffle=shuffle, seed=1)
+    dataset.set_epoch(2)
+    order = _shard_order(_indices(dataset))
+    for worker in range(3):
+        info = SimpleNamespace(id=worker, num_workers=3)
+        monkeypatch.setattr(shards, "get_worker_info", lambda: info)
+        assert _shard_order(_indices(dataset)) == order[worker::3]
+
+
+def _identity(sample):
+    return sample
+
+
+def test_dataloader_workers_cover_every_sample_once(sharded_path):
+    dataset = ShardedDataset(sharded_path, shuffle=True)
+    loader = DataLoader(dataset, batch_size=None, num_workers=2, collate_fn=_identity)
+    assert sorted(target["index"] for _, target in loader) == list(range(NUM_SAMPLES))
+
+
+def test_dataset_roundtrip(data_root, tmp_path):
+    dataset = ACID(data_root, eager=True, num_workers=0, return_arrays=True)
+    path = str(tmp_path / "shards")
+    export_shards(dataset, path, shard_size=1)
+    sharded = ShardedDataset(path)
+    assert len(sharded.shards) == len(dataset)
+    for i, (image, target) in enumerate(sharded):
+        expected_image, expected_target = dataset[i]
+        assert image.size == expected_image.size
+        np.testing.assert_array_equal(np.asarray(image), np.asarray(expected_image))
+        assert_same(target, expected_target)
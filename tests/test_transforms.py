@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from datasets import Luo2020
+from datasets import transforms as T
+
+
+def _image(width: int = 100, height: int = 50) -> Image.Image:
+    # red left half, blue right half
+    image = Image.new("RGB", (width, height), (0, 0, 255))
+    image.paste((255, 0, 0), (0, 0, width // 2, height))
+    return image
+
+
+def _target() -> dict:
+    return {
+        "boxes": np.array([[10, 5, 30, 25], [60, 0, 100, 50]], dtype=np.float32),
+        "keypoints": np.array([[10, 20], [90, 45]], dtype=np.float32),
+        "polygons": np.array([[0, 0], [40, 0], [40, 10]], dtype=np.float32),
+        "names": ["excavator", "worker"],
+    }
+
+
+def test_map_points_transforms_every_coordinate():
+    target = _target()
+    mapped = T.map_points(target, lambda points: points * np.float32(2))
+    np.testing.assert_array_equal(mapped["boxes"], target["boxes"] * 2)
+    np.testing.assert_array_equal(mapped["keypoints"], target["keypoints"] * 2)
+    np.testing.assert_array_equal(mapped["polygons"], target["polygons"] * 2)
+    assert mapped["names"] is target["names"]
+    # the input is left unchanged
+    np.testing.assert_array_equal(target["boxes"], _target()["boxes"])
+
+
+def test_map_points_keeps_boxes_xyxy():
+    mirrored = T.map_points({"boxes": np.array([[10, 5, 30, 25]])}, lambda points: -points)
+    np.testing.assert_array_equal(mirrored["boxes"], [[-30, -25, -10, -5]])
+    assert mirrored["boxes"].dtype == np.float32
+
+
+def test_map_points_keeps_the_shape_of_empty_targets():
+    mapped = T.map_points({"boxes": np.zeros((0, 4)), "polygons": np.zeros((0, 2))}, lambda points: points + 1)
+    assert mapped["boxes"].shape == (0, 4)
+    assert mapped["polygons"].shape == (0, 2)
+
+
+def test_scale():
+    scaled = T.scale(_target(), 0.5, 2)
+    np.testing.assert_array_equal(scaled["boxes"], [[5, 10, 15, 50], [30, 0, 50, 100]])
+    np.testing.assert_array_equal(scaled["keypoints"], [[5, 40], [45, 90]])
+
+
+def test_resize():
+    image, target = T.Resize((50, 100))(_image(), _target())
+    assert image.size == (50, 100)
+    np.testing.assert_allclose(target["boxes"], [[5, 10, 15, 50], [30, 0, 50, 100]])
+    np.testing.assert_allclose(target["polygons"], [[0, 0], [20, 0], [20, 20]])
+
+
+def test_random_horizontal_flip():
+    image, target = T.RandomHorizontalFlip(p=1)(_image(), _target())
+    assert image.getpixel((0, 0)) == (0, 0, 255) and image.getpixel((99, 0)) == (255, 0, 0)
+    np.testing.assert_array_equal(target["boxes"], [[70, 5, 90, 25], [0, 0, 40, 50]])
+    np.testing.assert_array_equal(target["keypoints"], [[90, 20], [10, 45]])
+    np.testing.assert_array_equal(target["polygons"], [[100, 0], [60, 0], [60, 10]])
+
+    original, original_target = _image(), _target()
+    assert T.RandomHorizontalFlip(p=0)(original, original_target) == (original, original_target)
+
+
+def test_random_crop(monkeypatch):
+    # the crop starts at the largest offsets, (40, 20)
+    monkeypatch.setattr(T.random, "randint", lambda low, high: high)
+    image, target = T.RandomCrop((60, 30))(_image(), _target())
+    assert image.size == (60, 30)
+    assert image.getpixel((0, 0)) == (255, 0, 0) and image.getpixel((59, 0)) == (0, 0, 255)
+    # boxes are clipped to the crop, the points are only moved
+    np.testing.assert_array_equal(target["boxes"], [[0, 0, 0, 5], [20, 0, 60, 30]])
+    np.testing.assert_array_equal(target["keypoints"], [[-30, 0], [50, 25]])
+    np.testing.assert_array_equal(target["polygons"], [[-40, -20], [0, -20], [0, -10]])
+
+    with pytest.raises(ValueError):
+        T.RandomCrop((101, 10))(_image(), _target())
+
+
+def test_compose_and_image_only():
+    transform = T.Compose([T.Resize((50, 25)), T.ImageOnly(lambda image: image.convert("L"))])
+    image, target = transform(_image(), _target())
+    assert image.mode == "L" and image.size == (50, 25)
+    np.testing.assert_allclose(target["keypoints"], [[5, 10], [45, 22.5]])
+
+
+def test_dataset_transform_gets_only_the_image(data_root):
+    plain = Luo2020(data_root, return_arrays=True)
+    seen = []
+
+    def transform(image):
+        seen.append(image)
+        return image.size
+
+    def target_transform(target):
+        return target["keypoints"].sum()
+
+    dataset = Luo2020(data_root, return_arrays=True, transform=transform, target_transform=target_transform)
+    image_size, keypoints_sum = dataset[1]
+    assert all(isinstance(image, Image.Image) for image in seen)
+    assert image_size == plain[1][0].size
+    assert keypoints_sum == plain[1][1]["keypoints"].sum()
+    assert dataset.__getitems__([0, 1]) == [dataset[0], dataset[1]]
+
+
+def test_dataset_joint_transforms(data_root):
+    plain = Luo2020(data_root, return_arrays=True)
+    dataset = Luo2020(data_root, return_arrays=True, transforms=T.Compose([T.Resize((32, 24))]))
+    for (image, target), (plain_image, plain_target) in zip(dataset.__getitems__([0, 1]), [plain[0], plain[1]]):
+        assert image.size == (32, 24)
+        np.testing.assert_allclose(target["keypoints"], plain_target["keypoints"] * [32 / 64, 24 / 48])
+        assert target["keypoint_names"] == plain_target["keypoint_names"]
+
+    with pytest.raises(ValueError):
+        Luo2020(data_root, transforms=T.Resize((32, 24)), transform=lambda image: image)